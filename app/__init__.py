@@ -2,7 +2,7 @@ from flask import Flask, request, redirect, url_for
 from flask_login import current_user, LoginManager
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from .config import Config
+from .config import get_config
 
 # Inicjalizacja globalna
 db = SQLAlchemy()
@@ -10,16 +10,25 @@ migrate = Migrate()
 login_manager = LoginManager()
 
 
-def create_app(config_class=Config):
+def create_app(config_class=None):
     app = Flask(__name__)
-    app.config.from_object(config_class)
+    # Bez jawnej klasy - profil z APP_ENV (development / production)
+    app.config.from_object(config_class or get_config())
 
     # 1. Inicjalizacja rozszerzeń
     db.init_app(app)
+    # Przed require_login - żeby liczyć też zapytanie ładujące użytkownika
+    from .services.query_metrics import query_metrics
+    query_metrics.init_app(app)
+    from .services.profiler import profiler
+    profiler.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
 
+    from .services.import_jobs import import_jobs
+    import_jobs.init_app(app)
+
     from .blueprints.main import bp as main_bp
     from .blueprints.portfolio import bp as portfolio_bp
     from .blueprints.settings import bp as settings_bp
@@ -32,11 +41,13 @@ def create_app(config_class=Config):
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(statistics_bp, url_prefix="/statistics")
 
-    from .models.user import User
+    # Tożsamość z cache TTL - żądania zalogowanego użytkownika nie pytają bazy o User/UserSettings
+    from .services.user_cache import user_cache
+    user_cache.init_app(app)
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return user_cache.get(int(user_id))
 
     # 4. Globalne wymuszanie logowania
     @app.before_request
@@ -58,7 +69,22 @@ def create_app(config_class=Config):
         holding,
         transaction,
         user_settings,
-        portfolio_history
+        portfolio_history,
+        imported_file,
+        portfolio_aggregate
     )  # noqa
 
+    # 6. Katalog definicji obligacji (po imporcie modeli - ładowany z bazy przy starcie)
+    from .services.bond_catalog import bond_catalog
+    bond_catalog.init_app(app)
+
+    from .services.portfolio_cache import portfolio_cache
+    portfolio_cache.init_app(app)
+    from .services.chart_cache import chart_cache
+    chart_cache.init_app(app)
+
+    # 7. Komendy CLI (flask aggregates rebuild, ...)
+    from .cli import register_commands
+    register_commands(app)
+
     return app
\ No newline at end of file
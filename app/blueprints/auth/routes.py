@@ -1,8 +1,9 @@
 from flask import render_template, request, redirect, url_for, flash
-from flask_login import login_user, logout_user, login_required
+from flask_login import login_user, logout_user, login_required, current_user
 from . import bp
 from ... import db
 from ...models.user import User
+from ...services.user_cache import user_cache
 
 
 @bp.route('/login', methods=['GET', 'POST'])
@@ -67,6 +68,7 @@ def register():
 @bp.route('/logout')  # Domyślnie to jest GET
 @login_required
 def logout():
+    user_cache.invalidate(current_user.id)
     logout_user()
     flash('Wylogowano.', 'info')
     return redirect(url_for('auth.login'))
\ No newline at end of file
@@ -1,55 +1,80 @@
-import pandas as pd
-from flask import render_template, flash, redirect, request, url_for, Response
+from __future__ import annotations
+
+from flask import (render_template, flash, redirect, request, url_for, Response, jsonify, send_file, abort,
+                   current_app, stream_with_context)
 from flask_login import login_required, current_user
 from . import bp
 from ...services.portfolio_service import PortfolioService
-from ...services.csv_service import CsvService
-from ...services.charts_service import build_current_value_timeseries, build_allocation_pie_data
+from ...services.holdings_service import HoldingsService, SORT_COLUMNS, FILTER_FIELDS, parse_filters
+from ...services.import_jobs import import_jobs
+from ...services.portfolio_cache import portfolio_cache
+from ...services.bond_catalog import bond_catalog
+from ...services.export_service import ExportService, EXPORT_FORMATS
+from ...services.aggregate_service import AggregateService
+from ...services.charts_service import CHART_FREQUENCIES
+from ...services.chart_cache import chart_cache
+from ...services.profiler import is_admin
 from ...services.inflation_service import fetch_poland_cpi_yoy, align_series_to_common_months
 from ...models.bond import Bond
-from ...models.holding import Holding
-from ...models.portfolio import Portfolio
-from ...models.transaction import Transaction
 from ... import db
+from ...lazy import lazy_import
+
+pd = lazy_import('pandas')
 
 
 @bp.get("/")
 @login_required
 def portfolio():
-    """Wyświetla portfolio użytkownika - tylko DB"""
-    df = PortfolioService.get_user_portfolio_df(current_user.id)
-
-    obligacje = []
-    if not df.empty:
-        df = df.fillna("").replace({"None": ""})
-        # Teraz cała logika mapowania jest schowana w metodzie .from_dataframe_row()
-        obligacje = [Bond.from_dataframe_row(row) for _, row in df.iterrows()]
-
-    return render_template("portfolio.html", obligacje=obligacje)
+    """Wyświetla portfolio użytkownika - jedna strona pozycji (filtrowanie i sortowanie w SQL)"""
+    filters = parse_filters(request.args)
+    sort = request.args.get('sort', 'id')
+    if sort not in SORT_COLUMNS:
+        sort = 'id'
+    descending = request.args.get('dir') == 'desc'
+
+    df, next_cursor = HoldingsService.get_page(
+        current_user.id, filters, sort=sort, descending=descending,
+        cursor=request.args.get('after'),
+        limit=request.args.get('per_page', current_app.config['HOLDINGS_PAGE_SIZE'], type=int)
+    )
+    obligacje = Bond.from_dataframe(df)
+
+    # Parametry bieżącego widoku (bez kursora) - do linków "następna strona" / "pierwsza strona"
+    view_args = {k: request.args[k] for k in FILTER_FIELDS + ['sort', 'dir', 'per_page'] if request.args.get(k)}
+    next_url = url_for('portfolio.portfolio', after=next_cursor, **view_args) if next_cursor else None
+    first_url = url_for('portfolio.portfolio', **view_args) if request.args.get('after') else None
+
+    return render_template("portfolio.html", obligacje=obligacje, filters=request.args, sort=sort,
+                           descending=descending, has_filters=bool(filters),
+                           next_url=next_url, first_url=first_url)
 
 
 @bp.get("/analiza")
 @login_required
 def portfolio_analysis():
     """Analiza portfela (widok)"""
+    # Sumy i podziały z agregatów (jak strona statystyk) - bez wczytywania ramki wszystkich pozycji
+    stats = AggregateService.get_statistics(current_user.id)
     # Początkowe dane (domyślnie 'D')
-    df = PortfolioService.get_user_portfolio_df(current_user.id)
-    timeseries = build_current_value_timeseries(df, freq='D')
-    
+    pyramid = chart_cache.get(current_user.id)
+    timeseries = pyramid.timeseries('D', current_app.config['CHART_MAX_POINTS'])
+
     # Wykres kołowy (Alokacja wg typu obligacji)
-    allocation_data = build_allocation_pie_data(df, group_by_candidates=['bond_type', 'Typ_Obligacji'], value_column='current_value')
+    allocation_data = stats['pie_data']
 
     # Inflacja
     inflation_data = {}
-    if not df.empty:
+    if stats['holdings_count']:
         # Przygotuj dane do porównania (ostatnie 5 lat dla przykładu)
         cpi = fetch_poland_cpi_yoy(start='2020-01-01')
         
-        # Przygotuj DataFrame z wartościami portfela do formatu oczekiwanego przez align
-        if timeseries['labels']:
+        # Pełny szereg miesięczny z piramidy (koniec miesiąca) - nie punkty wykresu po LTTB,
+        # które zależą od długości historii i wybierają lokalne ekstrema
+        monthly = pyramid.levels['M']
+        if not monthly.empty:
             ts_df = pd.DataFrame({
-                'date': timeseries['labels'],
-                'value': timeseries['values']
+                'date': monthly.index,
+                'value': monthly['total_value'].to_numpy()
             })
             comparison = align_series_to_common_months(ts_df, cpi)
             if not comparison.empty:
@@ -67,15 +92,33 @@ def portfolio_analysis():
 def chart_data():
     """API endpoint dla danych wykresów"""
     freq = request.args.get('freq', 'D')
-    valid_freqs = {'D': 'D', 'W': 'W-MON', 'M': 'ME', 'Q': 'QE'}
-    pandas_freq = valid_freqs.get(freq, 'D')
+    if freq not in CHART_FREQUENCIES:
+        freq = 'D'
+
+    # Liczba punktów (np. szerokość wykresu w pikselach), nie więcej niż CHART_MAX_POINTS
+    limit = current_app.config['CHART_MAX_POINTS']
+    max_points = max(3, min(request.args.get('max_points', limit, type=int), limit))
+
+    # Piramida D/W/M/Q z zapisanej wyceny (portfolio_history) - zmiana okresu to odczyt z cache
+    timeseries = chart_cache.get(current_user.id).timeseries(freq, max_points)
 
-    df = PortfolioService.get_user_portfolio_df(current_user.id)
-    timeseries = build_current_value_timeseries(df, freq=pandas_freq)
-    
     return timeseries  # Flask automatycznie zwróci JSON dla słownika
 
 
+@bp.get("/cache-stats")
+@login_required
+def cache_stats():
+    """Statystyki cache (trafienia / chybienia / rozmiar) - ramki portfela, wykresy i katalog obligacji"""
+    # Statystyki całego procesu (wszystkich użytkowników) - tylko dla administratorów albo w trybie debug
+    if not (current_app.debug or is_admin()):
+        abort(403)
+    return jsonify({
+        'portfolio_frames': portfolio_cache.stats(),
+        'chart_pyramids': chart_cache.stats(),
+        'bond_catalog': bond_catalog.stats(),
+    })
+
+
 @bp.get("/kalendarz")
 @login_required
 def portfolio_calendar():
@@ -84,89 +127,146 @@ def portfolio_calendar():
     events = []
 
     if not df.empty:
-        # Logikę ekstrakcji daty można by też przenieść do modelu, ale tutaj jest specyficzna
-        date_cols = ['Data_Wykupu', 'maturity_date']
-
-        for _, row in df.iterrows():
-            maturity = None
-            for col in date_cols:
-                if col in row and pd.notna(row[col]):
-                    try:
-                        maturity = pd.to_datetime(row[col], dayfirst=True).date()
-                        break
-                    except Exception:
-                        continue
-
-            if maturity:
-                # Budowanie tytułu
-                parts = [str(row.get(f)) for f in ['bond_type', 'series'] if row.get(f)]
-                title = " ".join(parts) or "Obligacja"
-
-                events.append({
-                    "title": f"Wykup: {title}",
-                    "start": maturity.isoformat(),
-                })
+        # Ramka jest typowana - maturity_date to już datetime64, bez parsowania wiersz po wierszu
+        dated = df[df['maturity_date'].notna()]
+        for bond_type, series, maturity in zip(dated['bond_type'].tolist(), dated['series'].tolist(),
+                                               dated['maturity_date'].dt.date.tolist()):
+            # Budowanie tytułu
+            parts = [str(v) for v in (bond_type, series) if pd.notna(v) and v]
+            title = " ".join(parts) or "Obligacja"
+
+            events.append({
+                "title": f"Wykup: {title}",
+                "start": maturity.isoformat(),
+            })
 
     return render_template("calendar.html", events=events)
 
 
+@bp.get("/export/<dataset>.<fmt>")
+@login_required
+def export(dataset, fmt):
+    """Eksport pozycji lub historii transakcji (CSV / NDJSON) - odpowiedź strumieniowa"""
+    queries = {
+        'holdings': (ExportService.holdings_select, 'portfel-pozycje'),
+        'transactions': (ExportService.transactions_select, 'portfel-transakcje'),
+    }
+    if dataset not in queries or fmt not in EXPORT_FORMATS:
+        abort(404)
+
+    build_select, filename = queries[dataset]
+    stream = ExportService.stream(build_select(current_user.id), fmt,
+                                  batch_size=current_app.config['EXPORT_BATCH_SIZE'])
+    return Response(
+        stream_with_context(stream),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{fmt}"'}
+    )
+
+
 @bp.post("/import_csv")
 @login_required
 def import_csv():
-    """Import danych z CSV"""
+    """Import danych z CSV - plik trafia do kolejki, import wykonuje się w tle"""
+    wants_json = request.accept_mimetypes.best == 'application/json'
     try:
         file = request.files.get("csv_file")
         if not file or not file.filename:
+            if wants_json:
+                return jsonify({"error": "Nie wybrano pliku."}), 400
             flash("Nie wybrano pliku.", "warning")
             return redirect(url_for('portfolio.portfolio'))
 
-        # Użycie nowego serwisu
-        df = CsvService.read_csv_with_encoding(file)
-
-        if df.empty:
-            flash("Plik CSV jest pusty.", "warning")
-            return redirect(url_for('portfolio.portfolio'))
-
-        # Import do DB
-        result = PortfolioService.import_csv_data(current_user.id, df)
+        job = import_jobs.submit(current_user.id, file, partial=request.form.get("partial") == "1")
 
-        if result['errors']:
-            error_msg = ', '.join(result['errors'][:3])
-            flash(f"Błędy podczas importu: {error_msg}...", "danger")
-        else:
-            flash(f"Pomyślnie zaimportowano {result['imported']} pozycji", "success")
+        if wants_json:
+            return jsonify({
+                "job_id": job.id,
+                "status_url": url_for('portfolio.import_status', job_id=job.id)
+            }), 202
+        flash("Import rozpoczęty - postęp widoczny poniżej.", "info")
+        return redirect(url_for('portfolio.portfolio', import_job=job.id))
 
     except Exception as e:
+        if wants_json:
+            return jsonify({"error": str(e)[:100]}), 503
         flash(f"Błąd krytyczny: {str(e)[:100]}", "danger")
 
     return redirect(url_for('portfolio.portfolio'))
 
 
+@bp.get("/import_csv/<job_id>")
+@login_required
+def import_status(job_id):
+    """Status importu w tle (JSON): postęp, błędy, szacowany czas do końca"""
+    job = import_jobs.get(job_id, current_user.id)
+    if not job:
+        return jsonify({"error": "Nie znaleziono importu."}), 404
+    data = job.to_dict()
+    if data['has_error_file']:
+        data['errors_url'] = url_for('portfolio.import_errors', job_id=job.id)
+    return jsonify(data)
+
+
+@bp.get("/import_csv/<job_id>/errors.csv")
+@login_required
+def import_errors(job_id):
+    """Plik CSV z wierszami odrzuconymi podczas importu częściowego"""
+    job = import_jobs.get(job_id, current_user.id)
+    if not job or not job.has_error_file():
+        flash("Brak pliku błędów dla tego importu.", "warning")
+        return redirect(url_for('portfolio.portfolio'))
+    return send_file(job.error_file, mimetype='text/csv', as_attachment=True,
+                     download_name=f"bledy-importu-{job.id[:8]}.csv")
+
+
 @bp.post("/delete/<int:holding_id>")
 @login_required
 def delete_holding(holding_id):
     """Usuwanie pozycji"""
     try:
-        holding = Holding.query.join(Portfolio).filter(
-            Holding.id == holding_id,
-            Portfolio.user_id == current_user.id
-        ).first()
-
-        if not holding:
-            flash("Pozycja nie została znaleziona.", "danger")
-        else:
-            # Usuwamy transakcje powiązane z tym holdingiem (po referencji)
-            Transaction.query.filter_by(
-                portfolio_id=holding.portfolio_id,
-                transaction_reference=holding.transaction_reference
-            ).delete()
-
-            db.session.delete(holding)
+        if PortfolioService.delete_holdings(current_user.id, holding_ids=[holding_id]):
             db.session.commit()
             flash("Usunięto pozycję.", "success")
+        else:
+            flash("Pozycja nie została znaleziona.", "danger")
 
     except Exception as e:
         db.session.rollback()
         flash(f"Błąd podczas usuwania: {str(e)}", "danger")
 
-    return redirect(url_for('portfolio.portfolio'))
\ No newline at end of file
+    return redirect(url_for('portfolio.portfolio'))
+
+
+@bp.post("/delete")
+@login_required
+def delete_holdings():
+    """
+    Zbiorcze usuwanie pozycji (z transakcjami) w jednej transakcji:
+      * scope=filtered + filtry jak w widoku portfela (np. series) - wszystkie pasujące,
+      * scope=all - cały portfel,
+      * bez scope: holding_id (wiele wartości) - zaznaczone pozycje.
+    """
+    holding_ids = request.form.getlist('holding_id', type=int)
+    filters = parse_filters(request.form)
+    scope = request.form.get('scope')
+
+    if scope == 'filtered' and filters:
+        kwargs = {'filters': filters}
+    elif scope == 'all':
+        kwargs = {}
+    elif holding_ids:
+        kwargs = {'holding_ids': holding_ids}
+    else:
+        flash("Nie wybrano pozycji do usunięcia.", "warning")
+        return redirect(url_for('portfolio.portfolio'))
+
+    try:
+        deleted = PortfolioService.delete_holdings(current_user.id, **kwargs)
+        db.session.commit()
+        flash(f"Usunięto pozycji: {deleted}.", "success" if deleted else "info")
+    except Exception as e:
+        db.session.rollback()
+        flash(f"Błąd podczas usuwania: {str(e)}", "danger")
+
+    return redirect(url_for('portfolio.portfolio'))
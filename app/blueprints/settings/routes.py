@@ -3,32 +3,37 @@ from flask_login import login_required, current_user
 from . import bp
 from ... import db
 from ...models.user_settings import UserSettings
+from ...services.user_cache import user_cache
 
 
-def ensure_user_settings_exist():
-    """Upewnia się, że użytkownik ma przypisany obiekt UserSettings."""
-    if not current_user.settings:
+def ensure_user_settings_exist() -> UserSettings:
+    """
+    Zwraca UserSettings użytkownika (w bieżącej sesji), w razie potrzeby tworząc domyślne.
+
+    current_user pochodzi z cache tożsamości (obiekt odłączony od sesji), więc
+    ustawienia do edycji są pobierane zapytaniem, a nie przez current_user.settings.
+    """
+    user_settings = db.session.get(UserSettings, current_user.id)
+    if user_settings is None:
         # Jeśli z jakiegoś powodu ustawienia nie istnieją, stwórz domyślne
         defaults = current_app.config['DEFAULT_SETTINGS']
-        new_settings = UserSettings(
+        user_settings = UserSettings(
             user_id=current_user.id,
             theme=defaults.get('theme', 'Dark'),
             language=defaults.get('language', 'Polski')
         )
-        db.session.add(new_settings)
+        db.session.add(user_settings)
         db.session.commit()
-        # Odśwież użytkownika, żeby widział relację
-        db.session.refresh(current_user)
+        # Następne żądanie załaduje użytkownika już z relacją
+        user_cache.invalidate(current_user.id)
+    return user_settings
 
 
 @bp.route("/", methods=["GET", "POST"])
 @login_required
 def settings():
     # 1. Zabezpieczenie: upewnij się, że rekord w bazie istnieje
-    ensure_user_settings_exist()
-
-    # Teraz możemy bezpiecznie odwoływać się do current_user.settings
-    user_settings = current_user.settings
+    user_settings = ensure_user_settings_exist()
 
     if request.method == "POST":
         action = request.form.get("action")
@@ -46,6 +51,7 @@ def settings():
 
             try:
                 db.session.commit()
+                user_cache.invalidate(current_user.id)
                 flash("Ustawienia zostały zapisane!", "success")
             except Exception as e:
                 db.session.rollback()
@@ -59,6 +65,7 @@ def settings():
 
             try:
                 db.session.commit()
+                user_cache.invalidate(current_user.id)
                 flash("Przywrócono ustawienia domyślne.", "info")
             except Exception:
                 db.session.rollback()
@@ -0,0 +1,59 @@
+import os
+import time
+from datetime import date
+
+import click
+from flask import Flask
+
+from .models.portfolio import Portfolio
+from .services.aggregate_service import AggregateService
+from . import db
+
+
+def register_commands(app: Flask):
+    """Komendy `flask ...` do utrzymania danych (uruchamiane ręcznie lub z crona)."""
+
+    @app.cli.group()
+    def aggregates():
+        """Zmaterializowane agregaty portfela (statystyki)."""
+
+    @aggregates.command('rebuild')
+    @click.option('--portfolio-id', type=int, default=None, help='Tylko wskazany portfel (domyślnie wszystkie).')
+    def rebuild_aggregates(portfolio_id):
+        """Przelicza agregaty od zera na podstawie pozycji - po migracji lub do naprawy."""
+        query = db.session.query(Portfolio.id).order_by(Portfolio.id)
+        if portfolio_id is not None:
+            query = query.filter(Portfolio.id == portfolio_id)
+
+        ids = [pid for (pid,) in query]
+        for pid in ids:
+            AggregateService.rebuild(pid)
+            # Commit per portfel - krótkie transakcje, przerwane przeliczenie można powtórzyć
+            db.session.commit()
+        click.echo(f"Przeliczono agregaty dla {len(ids)} portfeli.")
+
+    @app.cli.group()
+    def history():
+        """Dzienna historia wyceny portfeli (portfolio_history)."""
+
+    @history.command('snapshot')
+    @click.option('--until', type=click.DateTime(['%Y-%m-%d']), default=None,
+                  help='Ostatni wyceniany dzień (domyślnie dziś).')
+    @click.option('--workers', type=int, default=os.cpu_count() or 1, show_default=True,
+                  help='Liczba procesów roboczych (1 = w bieżącym procesie).')
+    @click.option('--batch-size', type=int, default=500, show_default=True, help='Portfele na porcję (commit).')
+    @click.option('--portfolio-id', type=int, multiple=True, help='Tylko wskazane portfele (domyślnie wszystkie).')
+    def snapshot_history(until, workers, batch_size, portfolio_id):
+        """Dopisuje brakujące dni historii wszystkich portfeli - do uruchamiania co noc (cron)."""
+        from .services.history_snapshot import run_snapshot
+
+        until = until.date() if until else date.today()
+        started = time.perf_counter()
+
+        def progress(done, total):
+            click.echo(f"  {done}/{total} portfeli ({time.perf_counter() - started:.0f} s)")
+
+        portfolios, days = run_snapshot(until, workers=workers, batch_size=max(1, batch_size),
+                                        portfolio_ids=list(portfolio_id) or None, progress=progress)
+        click.echo(f"Zapisano {days} dni historii dla {portfolios} portfeli do {until} "
+                   f"w {time.perf_counter() - started:.1f} s.")
@@ -17,11 +17,94 @@ class Config:
         f"?charset=utf8mb4"
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    MAX_CONTENT_LENGTH = 2 * 1024 * 1024
-    SQLALCHEMY_ECHO = True  # Dla deweloperki
+    # Pula połączeń: pre_ping i recycle chronią przed połączeniami zerwanymi przez
+    # wait_timeout MySQL po okresie bezczynności
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '280')),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true',
+    }
+    # Liczba zapytań SQL i czas w bazie per żądanie (log + opcjonalnie nagłówki X-DB-*)
+    QUERY_METRICS_ENABLED = True
+    QUERY_METRICS_HEADERS = os.getenv('QUERY_METRICS_HEADERS', 'false').lower() == 'true'
+    # Budżety zapytań per endpoint (wykrywanie N+1); ENFORCE = wyjątek zamiast ostrzeżenia
+    QUERY_BUDGET_DEFAULT = None
+    QUERY_BUDGETS = {
+        'portfolio.portfolio': 4,
+        'portfolio.portfolio_analysis': 8,
+        'portfolio.chart_data': 7,
+        'portfolio.portfolio_calendar': 5,
+        'portfolio.delete_holding': 15,
+        'portfolio.delete_holdings': 19,
+        'portfolio.import_csv': 3,
+        'portfolio.import_status': 2,
+        'statistics.statistics': 2,
+    }
+    QUERY_BUDGET_ENFORCE = os.getenv('QUERY_BUDGET_ENFORCE', 'false').lower() == 'true'
+    # Profiler próbkujący (collapsed stacks per endpoint); wyłączony = brak hooków
+    PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'false').lower() == 'true'
+    PROFILER_ENDPOINTS = [e for e in os.getenv('PROFILER_ENDPOINTS', '').split(',') if e]  # puste = wszystkie
+    PROFILER_SAMPLE_RATE = float(os.getenv('PROFILER_SAMPLE_RATE', '1.0'))  # część profilowanych żądań
+    PROFILER_INTERVAL = 0.005  # s między próbkami stosu
+    # Administratorzy mogą profilować pojedyncze żądanie nagłówkiem X-Profile: 1
+    PROFILER_ADMIN_EMAILS = [e for e in os.getenv('PROFILER_ADMIN_EMAILS', '').split(',') if e]
+    PROFILER_OUTPUT_DIR = os.getenv('PROFILER_OUTPUT_DIR')  # None = <instance>/profiles
+    # Import CSV jest strumieniowy (porcje po CSV_CHUNK_SIZE wierszy), więc limit
+    # pliku nie wpływa na szczytowe zużycie pamięci
+    MAX_CONTENT_LENGTH = 64 * 1024 * 1024
+    CSV_CHUNK_SIZE = 5000
+    # Importy w tle (kolejka w procesie)
+    IMPORT_WORKERS = int(os.getenv('IMPORT_WORKERS', '2'))
+    IMPORT_QUEUE_LIMIT = int(os.getenv('IMPORT_QUEUE_LIMIT', '20'))
+    IMPORT_SPOOL_DIR = os.getenv('IMPORT_SPOOL_DIR')  # None = katalog tymczasowy systemu
+    IMPORT_JOB_TTL = 3600  # Jak długo (s) trzymać status zakończonego importu
+    IMPORT_COMMIT_EVERY = 1000  # Tryb częściowy: commit co tyle wierszy (krótkie blokady)
+    EXPORT_BATCH_SIZE = 2000  # Wiersze na porcję przy eksporcie strumieniowym
+    # Katalog definicji obligacji w pamięci (ISIN -> definicja)
+    BOND_CATALOG_MAX_SIZE = 10000
+    BOND_CATALOG_WARM_ON_STARTUP = True
+    # Cache ramek portfela per użytkownik (unieważniany przez Portfolio.data_version)
+    PORTFOLIO_CACHE_MAX_ENTRIES = 1000
+    PORTFOLIO_CACHE_MAX_BYTES = int(os.environ.get('PORTFOLIO_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+    HOLDINGS_PAGE_SIZE = 100  # Pozycje na stronę w tabeli portfela
+    CHART_MAX_POINTS = 1000  # Limit punktów wykresu wartości (downsampling LTTB)
+    CHART_CACHE_MAX_ENTRIES = 1000  # Piramidy D/W/M/Q wykresu wartości w pamięci (per użytkownik)
+    # Cache tożsamości (User + UserSettings) w user_loader; 0 = wyłączony
+    USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '30'))
+    USER_CACHE_MAX_ENTRIES = 10000
+    SQLALCHEMY_ECHO = os.getenv('SQLALCHEMY_ECHO', 'false').lower() == 'true'
     # App
     THEMES = ['Dark', 'Light']
     LANGUAGES = ['Polski', 'English', 'Deutsch']
     DEFAULT_SETTINGS = {'theme': 'Dark', 'language': 'Polski'}
     #FETCH_CPI = os.getenv('FETCH_CPI', 'false').lower() == 'true'
 
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    SQLALCHEMY_ECHO = True  # Dla deweloperki
+    QUERY_METRICS_HEADERS = True
+
+
+class ProductionConfig(Config):
+    DEBUG = False
+    SQLALCHEMY_ECHO = False  # Logowanie każdego zapytania spowalnia workery i zaśmieca logi
+    QUERY_METRICS_HEADERS = False
+
+
+# Profile konfiguracji wybierane zmienną środowiskową APP_ENV (domyślnie production -
+# DEBUG i logowanie SQL tylko po jawnym APP_ENV=development)
+CONFIGS = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+}
+
+
+def get_config(name: str = None):
+    name = (name or os.getenv('APP_ENV', 'production')).lower()
+    try:
+        return CONFIGS[name]
+    except KeyError:
+        raise ValueError(f"Nieznany profil konfiguracji APP_ENV={name!r} (dostępne: {', '.join(CONFIGS)})")
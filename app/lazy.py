@@ -0,0 +1,51 @@
+import importlib.util
+import sys
+import threading
+from types import ModuleType
+
+# Reentrant: ładowanie jednego modułu (pandas) może dotknąć innego leniwego (numpy)
+_lock = threading.RLock()
+# Klasa nadana modułowi przez LazyLoader (wyzwala wczytanie), wg nazwy modułu
+_loader_class = {}
+
+
+class _LazyModule(ModuleType):
+    """
+    Leniwy moduł ładowany pod blokadą. LazyLoader w Pythonie 3.11 nie jest bezpieczny
+    wątkowo: zmienia klasę modułu przed wykonaniem jego kodu, więc drugi wątek (np. zadanie
+    importu CSV obok żądania) widzi w tym czasie moduł bez atrybutów (AttributeError).
+    """
+
+    def __getattribute__(self, attr):
+        with _lock:
+            if type(self) is _LazyModule:
+                # Wczytanie przez LazyLoader, w wątku trzymającym blokadę
+                self.__class__ = _loader_class[ModuleType.__getattribute__(self, '__name__')]
+        return getattr(self, attr)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Moduł ładowany dopiero przy pierwszym użyciu atrybutu (importlib.util.LazyLoader).
+
+    Ciężkie biblioteki (pandas, numpy) nie są potrzebne do uruchomienia aplikacji ani
+    do obsługi większości żądań - dzięki temu start workera (create_app) ich nie płaci.
+    Moduły używające lazy_import deklarują `from __future__ import annotations`, żeby
+    adnotacje typu `pd.DataFrame` nie wymuszały importu przy definicji funkcji.
+    """
+    with _lock:
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+
+        spec = importlib.util.find_spec(name)
+        if spec is None:
+            raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+        loader = importlib.util.LazyLoader(spec.loader)
+        spec.loader = loader
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        loader.exec_module(module)
+        _loader_class[name] = module.__class__
+        module.__class__ = _LazyModule
+        return module
@@ -15,4 +15,6 @@ def import_models():
     # --- NOWE MODELE ---
     from . import user_settings
     from . import portfolio_history
+    from . import imported_file
+    from . import portfolio_aggregate
     # -------------------
\ No newline at end of file
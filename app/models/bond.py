@@ -1,4 +1,16 @@
+from __future__ import annotations
+
+from typing import List
+from ..lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+
 class Bond:
+    __slots__ = ('id', 'data_zakupu', 'seria_obligacji', 'typ_obligacji', 'wartosc_nominalna', 'cena_zakupu',
+                 'data_emisji', 'data_wykupu', 'oprocentowanie', 'aktualna_wartosc', 'kod_ISIN',
+                 'numer_transakcji')
+
     # Mapowanie nazw kolumn z CSV/DB na pola obiektu
     COLUMN_MAPPING = {
         'data_zakupu': ['Data_Zakupu', 'purchase_date'],
@@ -29,6 +41,55 @@ class Bond:
         self.kod_ISIN = kod_ISIN
         self.numer_transakcji = numer_transakcji
 
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> List['Bond']:
+        """
+        Fabryka zbiorcza: lista obiektów Bond dla całego DataFrame.
+        Kolumny z COLUMN_MAPPING są wybierane raz na ramkę, a wartości scalane
+        na całych kolumnach - wynik jak from_dataframe_row dla każdego wiersza.
+        """
+        if df.empty:
+            return []
+
+        fields = ['data_zakupu', 'seria_obligacji', 'typ_obligacji', 'wartosc_nominalna', 'cena_zakupu',
+                  'data_emisji', 'data_wykupu']
+        values = [cls._column_values(df, f) for f in fields]
+        values.append(cls._format_coupon_column(df))
+        values += [cls._column_values(df, f) for f in ('aktualna_wartosc', 'kod_ISIN', 'numer_transakcji')]
+        values.append(df['holding_id'].tolist() if 'holding_id' in df.columns else [None] * len(df))
+
+        return [cls(*row) for row in zip(*values)]
+
+    @classmethod
+    def _column_values(cls, df: pd.DataFrame, field_name: str) -> list:
+        """Pierwsza niepusta wartość spośród kolumn kandydatów, "" gdy brak (jak _get_val)."""
+        result = pd.Series("", index=df.index, dtype=object)
+        for candidate in reversed(cls.COLUMN_MAPPING.get(field_name, [])):
+            if candidate in df.columns:
+                column = df[candidate]
+                if pd.api.types.is_datetime64_any_dtype(column):
+                    column = column.dt.date  # ramka typowana: wyświetlamy daty, nie Timestamp
+                result = column.where(_present(column), result)
+        return result.tolist()
+
+    @staticmethod
+    def _format_coupon_column(df: pd.DataFrame) -> list:
+        """Oprocentowanie dla całej ramki - formatowane raz na każdą unikalną stawkę."""
+        result = pd.Series("", index=df.index, dtype=object)
+        if "coupon_rate" in df.columns:
+            rates = df["coupon_rate"]
+            formatted = {}
+            for rate in rates[_present(rates)].unique():
+                try:
+                    formatted[rate] = f"{round(float(rate) * 100, 2)}%"
+                except (ValueError, TypeError):
+                    pass
+            result = rates.map(formatted).where(lambda s: s.notna(), result)
+        if "Oprocentowanie" in df.columns:
+            text = df["Oprocentowanie"]
+            result = text.where(_present(text) & text.astype(bool), result)
+        return result.tolist()
+
     @classmethod
     def from_dataframe_row(cls, row):
         """Fabryka: tworzy obiekt Bond na podstawie wiersza DataFrame"""
@@ -71,4 +132,11 @@ class Bond:
         return ""
 
     def __repr__(self):
-        return f"<Obligacja {self.seria_obligacji}>"
\ No newline at end of file
+        return f"<Obligacja {self.seria_obligacji}>"
+
+
+def _present(column: pd.Series) -> pd.Series:
+    """Maska wartości uznawanych za niepuste (nie None/NaN, nie "" i nie "None")."""
+    if pd.api.types.is_numeric_dtype(column) or pd.api.types.is_datetime64_any_dtype(column):
+        return column.notna()
+    return column.notna() & ~column.isin(("", "None"))
\ No newline at end of file
@@ -15,6 +15,8 @@ class BondDefinition(db.Model):
     emission_date = db.Column(db.Date)
     coupon_rate = db.Column(db.DECIMAL(5, 4))
     nominal_value = db.Column(db.DECIMAL(10, 2), default=100.00)
+    # Rynek (Skarbowe / Korporacyjne) - wyliczany raz przy tworzeniu definicji (classify_markets)
+    market_category = db.Column(db.VARCHAR(20), nullable=False, server_default='Korporacyjne', index=True)
     created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow, nullable=False)
 
     holdings = db.relationship('Holding', backref='bond_definition', lazy=True)
@@ -31,6 +31,9 @@ class Holding(db.Model):
         # USUNIĘTO UniqueConstraint aby pozwolić na wiele "partii" (lots) tej samej obligacji
         # np. kupionych w różnych datach lub cenach.
         # db.UniqueConstraint('portfolio_id', 'bond_definition_id', name='uq_holding_portfolio_bond'),
+
+        # Stronicowanie tabeli pozycji (kursor po dacie zakupu w obrębie portfela)
+        db.Index('idx_holding_portfolio_purchase', 'portfolio_id', 'purchase_date', 'id'),
     )
 
     def __repr__(self):
@@ -0,0 +1,23 @@
+from datetime import datetime
+from .. import db
+
+
+class ImportedFile(db.Model):
+    __tablename__ = 'imported_files'
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    portfolio_id = db.Column(db.BigInteger, db.ForeignKey('portfolios.id'), nullable=False, index=True)
+
+    # SHA-256 całej zawartości pliku - ten sam plik wgrany ponownie jest pomijany
+    content_hash = db.Column(db.String(64), nullable=False)
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    imported_rows = db.Column(db.Integer, nullable=False, default=0)
+
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('portfolio_id', 'content_hash', name='uq_imported_file_hash'),
+    )
+
+    def __repr__(self):
+        return f'<ImportedFile {self.content_hash[:12]} rows={self.row_count}>'
@@ -13,6 +13,9 @@ class Portfolio(db.Model):
     # --- ZMIANA: Dodano pole gotówki ---
     cash_balance = db.Column(db.DECIMAL(15, 2), default=0.00, nullable=False)
 
+    # Licznik zmian pozycji - podbijany przy imporcie i usuwaniu (unieważnia cache ramek portfela)
+    data_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+
     created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
 
@@ -0,0 +1,31 @@
+from datetime import datetime
+from decimal import Decimal
+from .. import db
+
+
+class PortfolioAggregate(db.Model):
+    """
+    Zmaterializowane sumy portfela dla strony statystyk.
+    Jeden wiersz na (portfel, wymiar, grupa) - np. ('bond_type', 'EDO') albo ('total', '').
+    Aktualizowane przyrostowo przy imporcie i usuwaniu pozycji (AggregateService).
+    """
+    __tablename__ = 'portfolio_aggregates'
+
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    portfolio_id = db.Column(db.BigInteger, db.ForeignKey('portfolios.id'), nullable=False)
+
+    dimension = db.Column(db.String(20), nullable=False)  # 'total', 'bond_type', 'market'
+    group_key = db.Column(db.String(100), nullable=False, default='')
+
+    total_value = db.Column(db.DECIMAL(18, 4), nullable=False, default=Decimal('0'))
+    invested_cost = db.Column(db.DECIMAL(18, 4), nullable=False, default=Decimal('0'))
+    holdings_count = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (
+        db.UniqueConstraint('portfolio_id', 'dimension', 'group_key', name='uq_portfolio_aggregate_group'),
+    )
+
+    def __repr__(self):
+        return f'<PortfolioAggregate {self.dimension}={self.group_key} value={self.total_value}>'
@@ -9,9 +9,11 @@ class PortfolioHistory(db.Model):
     portfolio_id = db.Column(db.BigInteger, db.ForeignKey('portfolios.id'), nullable=False, index=True)
 
     date = db.Column(db.Date, nullable=False, index=True)
-    total_value = db.Column(db.DECIMAL(15, 2), nullable=False)  # Łączna wartość (gotówka + obligacje)
-    cash_value = db.Column(db.DECIMAL(15, 2), default=0.00)  # Ile było gotówki
+    total_value = db.Column(db.DECIMAL(15, 2), nullable=False)  # Łączna wartość (gotówka z wykupów + obligacje)
+    cash_value = db.Column(db.DECIMAL(15, 2), default=0.00)  # Gotówka z wykupów (bez Portfolio.cash_balance)
     bond_value = db.Column(db.DECIMAL(15, 2), default=0.00)  # Ile były warte obligacje
+    invested_value = db.Column(db.DECIMAL(15, 2), default=0.00, server_default='0',
+                               nullable=False)  # Koszt zakupu posiadanych do tego dnia pozycji
 
     created_at = db.Column(db.DateTime, default=datetime.now)
 
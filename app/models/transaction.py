@@ -15,6 +15,8 @@ class Transaction(db.Model):
     fees = db.Column(db.DECIMAL(10, 2), default=0.00)
     transaction_reference = db.Column(db.VARCHAR(100), index=True)
     notes = db.Column(db.Text)
+    # Odcisk znormalizowanego wiersza importu (64-bit) - deduplikacja ponownie wgranych plików
+    row_fingerprint = db.Column(db.BigInteger)
     created_at = db.Column(db.DateTime, default=datetime.now)
 
     # portfolio = db.relationship('Portfolio', backref=db.backref('transactions', lazy=True))
@@ -22,5 +24,6 @@ class Transaction(db.Model):
 
     __table_args__ = (
         db.Index('idx_portfolio_date', 'portfolio_id', 'transaction_date'),
+        db.Index('idx_portfolio_fingerprint', 'portfolio_id', 'row_fingerprint'),
     )
 
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+
+from app.models.portfolio import Portfolio
+from app.models.bond_definition import BondDefinition
+from app.models.holding import Holding
+from app.models.portfolio_aggregate import PortfolioAggregate
+from .batching import chunked
+from .. import db
+from ..lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+# Etykieta grupy dla pozycji bez typu obligacji (jak w build_allocation_pie_data)
+_MISSING_GROUP = 'Inne'
+
+
+class AggregateService:
+    """
+    Zmaterializowane sumy portfela (tabela portfolio_aggregates) dla stron statystyk i analizy.
+
+    Import i usuwanie pozycji przekazują zmiany per definicja obligacji (delta wartości,
+    kosztu i liczby pozycji), a serwis dodaje je do wierszy grup jednym UPSERT-em
+    w tej samej transakcji - odczyt statystyk to O(liczba grup), niezależnie od
+    wielkości portfela. rebuild() przelicza agregaty od zera (naprawa / pierwsze wypełnienie).
+    """
+
+    @staticmethod
+    def apply_deltas(portfolio_id: int, deltas: Iterable[Tuple[int, float, float, int]]):
+        """
+        Dodaje zmiany do agregatów portfela.
+        deltas: krotki (bond_definition_id, delta_wartości, delta_kosztu, delta_liczby_pozycji).
+        """
+        frame = pd.DataFrame(list(deltas), columns=['bond_definition_id', 'value', 'cost', 'count'])
+        if frame.empty:
+            return
+        per_bond = frame.groupby('bond_definition_id').sum()
+
+        groups = _definition_groups(per_bond.index.tolist())
+        per_bond = per_bond.join(groups, how='inner')
+
+        rows = [('total', '', per_bond['value'].sum(), per_bond['cost'].sum(), per_bond['count'].sum())]
+        for dimension in ('bond_type', 'market'):
+            summed = per_bond.groupby(dimension)[['value', 'cost', 'count']].sum()
+            rows += zip([dimension] * len(summed), summed.index, summed['value'], summed['cost'], summed['count'])
+
+        _upsert_add(portfolio_id, rows)
+        # Grupy bez pozycji (np. po usunięciu ostatniej obligacji danego typu) znikają
+        db.session.execute(
+            delete(PortfolioAggregate)
+            .where(PortfolioAggregate.portfolio_id == portfolio_id, PortfolioAggregate.holdings_count <= 0)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def holding_deltas(holdings: Iterable[Tuple[int, Optional[float], float, float]],
+                       sign: int = 1) -> List[Tuple[int, float, float, int]]:
+        """Delty dla całych pozycji: krotki (bond_definition_id, current_value, quantity, purchase_price)."""
+        return [
+            (bd_id, sign * float(value or 0), sign * float(qty) * float(price), sign)
+            for bd_id, value, qty, price in holdings
+        ]
+
+    @staticmethod
+    def rebuild(portfolio_id: int):
+        """Przelicza agregaty portfela od zera na podstawie tabeli holdings (bez commita)."""
+        db.session.execute(
+            delete(PortfolioAggregate)
+            .where(PortfolioAggregate.portfolio_id == portfolio_id)
+            .execution_options(synchronize_session=False)
+        )
+        result = db.session.execute(
+            select(Holding.bond_definition_id,
+                   func.sum(func.coalesce(Holding.current_value, 0)),
+                   func.sum(Holding.quantity * Holding.purchase_price),
+                   func.count(Holding.id))
+            .where(Holding.portfolio_id == portfolio_id)
+            .group_by(Holding.bond_definition_id)
+        )
+        AggregateService.apply_deltas(portfolio_id, [
+            (bd_id, float(value or 0), float(cost or 0), count) for bd_id, value, cost, count in result
+        ])
+
+    @staticmethod
+    def get_statistics(user_id: int) -> Dict[str, any]:
+        """
+        Dane stron statystyk i analizy z agregatów wszystkich portfeli użytkownika:
+        total_value, invested_cost, pie_data (wg typu) i market_data (Skarbowe / Korporacyjne).
+        """
+        result = db.session.execute(
+            select(PortfolioAggregate.dimension, PortfolioAggregate.group_key,
+                   func.sum(PortfolioAggregate.total_value),
+                   func.sum(PortfolioAggregate.invested_cost),
+                   func.sum(PortfolioAggregate.holdings_count))
+            .join(Portfolio, Portfolio.id == PortfolioAggregate.portfolio_id)
+            .where(Portfolio.user_id == user_id)
+            .group_by(PortfolioAggregate.dimension, PortfolioAggregate.group_key)
+        )
+
+        totals = {'total_value': 0.0, 'invested_cost': 0.0, 'holdings_count': 0}
+        groups = {'bond_type': {}, 'market': {}}
+        for dimension, key, value, cost, count in result:
+            if dimension == 'total':
+                totals = {'total_value': float(value), 'invested_cost': float(cost), 'holdings_count': int(count)}
+            elif dimension in groups:
+                groups[dimension][key] = float(value)
+
+        return dict(totals, pie_data=_pie(groups['bond_type']), market_data=_pie(groups['market']))
+
+
+def _definition_groups(bond_def_ids: List[int]) -> pd.DataFrame:
+    """
+    Grupy (typ obligacji, rynek) dla definicji - prosto z bazy, bo w trakcie importu
+    mogą to być definicje jeszcze niezatwierdzone (nieobecne w katalogu).
+    """
+    records = []
+    for chunk in chunked([int(x) for x in bond_def_ids]):
+        records += db.session.execute(
+            select(BondDefinition.id, BondDefinition.bond_type, BondDefinition.market_category)
+            .where(BondDefinition.id.in_(chunk))
+        ).all()
+    groups = pd.DataFrame(records, columns=['bond_definition_id', 'bond_type', 'market'])
+    groups['bond_type'] = groups['bond_type'].fillna('').replace('', _MISSING_GROUP)
+    return groups.set_index('bond_definition_id')
+
+
+def _upsert_add(portfolio_id: int, rows: List[Tuple[str, str, float, float, int]]):
+    """
+    INSERT wierszy grup albo dodanie wartości do istniejących (jedno zapytanie wielowierszowe).
+    MySQL: ON DUPLICATE KEY UPDATE, SQLite/PostgreSQL: ON CONFLICT DO UPDATE.
+    """
+    table = PortfolioAggregate.__table__
+    now = datetime.now()
+    values = [
+        {'portfolio_id': portfolio_id, 'dimension': dimension, 'group_key': str(key)[:100],
+         'total_value': round(float(value), 4), 'invested_cost': round(float(cost), 4),
+         'holdings_count': int(count), 'updated_at': now}
+        for dimension, key, value, cost, count in rows
+    ]
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        stmt = dialect_insert(table).values(values)
+        new = stmt.inserted
+        stmt = stmt.on_duplicate_key_update(
+            total_value=table.c.total_value + new.total_value,
+            invested_cost=table.c.invested_cost + new.invested_cost,
+            holdings_count=table.c.holdings_count + new.holdings_count,
+            updated_at=new.updated_at,
+        )
+    else:
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table).values(values)
+        new = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['portfolio_id', 'dimension', 'group_key'],
+            set_={
+                'total_value': table.c.total_value + new.total_value,
+                'invested_cost': table.c.invested_cost + new.invested_cost,
+                'holdings_count': table.c.holdings_count + new.holdings_count,
+                'updated_at': new.updated_at,
+            },
+        )
+    db.session.execute(stmt)
+
+
+def _pie(values: Dict[str, float]) -> Dict[str, List]:
+    """Dane wykresu kołowego jak z build_allocation_pie_data (malejąco po wartości)."""
+    ordered = sorted(values.items(), key=lambda item: item[1], reverse=True)
+    return {
+        'labels': [label for label, _ in ordered],
+        'values': [round(value, 2) for _, value in ordered],
+    }
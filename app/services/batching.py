@@ -0,0 +1,10 @@
+from typing import Iterator, Sequence
+
+# Maksymalna liczba wartości w jednym zapytaniu IN (...)
+IN_BATCH_SIZE = 1000
+
+
+def chunked(items: Sequence, size: int = IN_BATCH_SIZE) -> Iterator[Sequence]:
+    """Kolejne wycinki `items` po `size` elementów (np. listy id do zapytań IN (...))."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
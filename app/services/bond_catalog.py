@@ -0,0 +1,117 @@
+import logging
+from typing import Dict, Iterable, List
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.models.bond_definition import BondDefinition
+from .cache import LRUCache
+from .batching import chunked
+from .. import db
+
+logger = logging.getLogger(__name__)
+
+# Kolumny definicji obligacji trzymane w katalogu (bez pól technicznych)
+CATALOG_COLUMNS = ['id', 'isin', 'name', 'issuer', 'series', 'bond_type',
+                   'maturity_date', 'emission_date', 'coupon_rate', 'nominal_value', 'market_category']
+
+
+class BondCatalog:
+    """
+    Katalog definicji obligacji (BondDefinition) w pamięci procesu, indeksowany po ISIN i id.
+
+    Serii obligacji jest niewiele i zmieniają się rzadko, więc katalog jest ładowany
+    przy starcie aplikacji, ograniczony LRU i uzupełniany przy tworzeniu nowych
+    definicji - powtórne odczyty nie trafiają do bazy. Wpisy to słowniki
+    (kopie danych), a nie obiekty ORM, więc są bezpieczne między sesjami i wątkami.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self._by_isin = LRUCache(max_size)
+        self._by_id = LRUCache(max_size)
+
+    def init_app(self, app):
+        max_size = app.config['BOND_CATALOG_MAX_SIZE']
+        self._by_isin = LRUCache(max_size)
+        self._by_id = LRUCache(max_size)
+        app.extensions['bond_catalog'] = self
+
+        if app.config['BOND_CATALOG_WARM_ON_STARTUP']:
+            with app.app_context():
+                try:
+                    self.warm()
+                except SQLAlchemyError as e:
+                    # Np. przy `flask db upgrade` tabela może jeszcze nie istnieć
+                    logger.warning("Nie udało się załadować katalogu obligacji: %s", e)
+                finally:
+                    db.session.remove()
+
+    def warm(self):
+        """Ładuje do katalogu najnowsze definicje (maksymalnie tyle, ile mieści cache)."""
+        self._store(db.session.execute(
+            _catalog_select().order_by(BondDefinition.id.desc()).limit(self._by_id.max_size)
+        ))
+
+    def get_ids(self, isins: Iterable[str]) -> Dict[str, int]:
+        """Mapa ISIN -> id dla istniejących definicji. Brakujące w katalogu są doczytywane zapytaniem IN."""
+        return {isin: info['id'] for isin, info in self.get_many(isins).items()}
+
+    def get_many(self, isins: Iterable[str]) -> Dict[str, Dict]:
+        """Definicje (słowniki) dla podanych ISIN; ISIN nieistniejące w bazie są pomijane."""
+        found = {}
+        missing = []
+        for isin in set(isins):
+            info = self._by_isin.get(isin)
+            if info is None:
+                missing.append(isin)
+            else:
+                found[isin] = info
+        for chunk in chunked(sorted(missing)):
+            for info in self._store(db.session.execute(_catalog_select().where(BondDefinition.isin.in_(chunk)))):
+                found[info['isin']] = info
+        return found
+
+    def get_many_by_id(self, ids: Iterable[int]) -> Dict[int, Dict]:
+        """Definicje (słowniki) dla podanych id; brakujące w katalogu są doczytywane zapytaniem IN."""
+        found = {}
+        missing = []
+        for bond_id in set(ids):
+            info = self._by_id.get(bond_id)
+            if info is None:
+                missing.append(bond_id)
+            else:
+                found[bond_id] = info
+        for chunk in chunked(sorted(missing)):
+            for info in self._store(db.session.execute(_catalog_select().where(BondDefinition.id.in_(chunk)))):
+                found[info['id']] = info
+        return found
+
+    def refresh(self, isins: Iterable[str]):
+        """Ponownie wczytuje podane definicje z bazy (np. po ich utworzeniu i commicie)."""
+        isins = sorted(set(isins))
+        for isin in isins:
+            info = self._by_isin.pop(isin)
+            if info:
+                self._by_id.pop(info['id'])
+        self.get_many(isins)
+
+    def clear(self):
+        self._by_isin.clear()
+        self._by_id.clear()
+
+    def stats(self) -> Dict[str, Dict]:
+        return {'by_isin': self._by_isin.stats(), 'by_id': self._by_id.stats()}
+
+    def _store(self, result) -> List[Dict]:
+        infos = [dict(row._mapping) for row in result]
+        for info in infos:
+            self._by_isin.put(info['isin'], info)
+            self._by_id.put(info['id'], info)
+        return infos
+
+
+def _catalog_select():
+    return select(*(getattr(BondDefinition, c) for c in CATALOG_COLUMNS))
+
+
+bond_catalog = BondCatalog()
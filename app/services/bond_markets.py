@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from ..lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+# Kategorie rynku obligacji (BondDefinition.market_category)
+MARKET_TREASURY = 'Skarbowe'
+MARKET_CORPORATE = 'Korporacyjne'
+MARKET_CATEGORIES = [MARKET_TREASURY, MARKET_CORPORATE]
+TREASURY_ISSUER_KEYWORDS = ('skarb', 'minister')
+TREASURY_SERIES_PREFIXES = ('OTS', 'DOS', 'TOZ', 'COI', 'EDO', 'ROR', 'DOR', 'SP', 'DS', 'WS', 'PS')
+
+
+def classify_markets(issuer: pd.Series, series: pd.Series) -> pd.Categorical:
+    """
+    Kategoria rynku (Skarbowe / Korporacyjne) dla wielu obligacji naraz - operacje
+    na całych kolumnach, bez funkcji wołanej per wiersz. Wynik trafia do kolumny
+    BondDefinition.market_category przy tworzeniu definicji; ta sama reguła jest w migracji backfill.
+    """
+    issuer = pd.Series(issuer).astype('string').str.lower()
+    series = pd.Series(series).astype('string').str.upper()
+    # 1. Emitent - Skarb Państwa; 2. typowe serie detalicznych obligacji skarbowych
+    treasury = (issuer.str.contains('|'.join(TREASURY_ISSUER_KEYWORDS), regex=True, na=False)
+                | series.str.startswith(TREASURY_SERIES_PREFIXES, na=False))
+    # Pozostałe (także z typem "korporacyjne") - Korporacyjne
+    return pd.Categorical(np.where(treasury.to_numpy(), MARKET_TREASURY, MARKET_CORPORATE),
+                          categories=MARKET_CATEGORIES)
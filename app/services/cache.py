@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Prosty, bezpieczny wątkowo cache LRU ograniczony liczbą wpisów i opcjonalnie
+    łącznym rozmiarem (max_bytes, rozmiar wpisu liczy funkcja sizeof).
+    Z ttl (sekundy) wpis starszy niż ttl jest traktowany jak brakujący.
+    Zlicza trafienia, chybienia i usunięcia (stats()).
+    """
+
+    def __init__(self, max_size: int = 1024, max_bytes: Optional[int] = None,
+                 sizeof: Optional[Callable[[object], int]] = None, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._expires = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if self.ttl is not None and self._expires[key] <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                self.expirations += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value):
+        size = self._sizeof(value) if self._sizeof else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            # Wpis większy niż cały cache - nie ma sensu wypychać wszystkiego
+            self.pop(key)
+            return
+        with self._lock:
+            self.total_bytes += size - self._sizes.get(key, 0)
+            self._sizes[key] = size
+            if self.ttl is not None:
+                self._expires[key] = time.monotonic() + self.ttl
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size or (
+                    self.max_bytes is not None and self.total_bytes > self.max_bytes):
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default=None):
+        with self._lock:
+            return self._remove(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._expires.clear()
+            self.total_bytes = 0
+
+    def _remove(self, key: Hashable, default=None):
+        # Wywoływane pod self._lock
+        self.total_bytes -= self._sizes.pop(key, 0)
+        self._expires.pop(key, None)
+        return self._data.pop(key, default)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'ttl': self.ttl,
+            'hit_ratio': round(self.hits / total, 4) if total else None,
+        }
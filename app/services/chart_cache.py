@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from app.models.portfolio import Portfolio
+from app.models.portfolio_history import PortfolioHistory
+from .cache import LRUCache
+from .charts_service import build_history_pyramid, timeseries_payload
+from .valuation_service import ValuationService
+from .. import db
+from ..lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+# Ile gotowych odpowiedzi (częstotliwość, liczba punktów) trzymać w jednej piramidzie
+_MAX_PAYLOADS = 32
+
+
+class ChartPyramid:
+    """
+    Szereg wartości portfela na wszystkich poziomach (D/W/M/Q) plus gotowe odpowiedzi
+    /chart-data dla par (częstotliwość, max_points) - przełączenie okresu to odczyt słownika.
+    Odpowiedzi są współdzielone - wywołujący nie mogą ich modyfikować.
+    """
+
+    def __init__(self, levels: Dict[str, pd.DataFrame]):
+        self.levels = levels
+        self._payloads = {}
+
+    def timeseries(self, freq: str, max_points: Optional[int] = None) -> Dict[str, List]:
+        key = (freq, max_points)
+        payload = self._payloads.get(key)
+        if payload is None:
+            if len(self._payloads) >= _MAX_PAYLOADS:
+                self._payloads.clear()
+            payload = self._payloads[key] = timeseries_payload(self.levels[freq], max_points)
+        return payload
+
+
+class ChartPyramidCache:
+    """
+    Cache piramid wykresu wartości portfela per użytkownik.
+
+    Klucz to (użytkownik, wersja historii): dla każdego portfela data_version i ostatni
+    zapisany dzień portfolio_history - jedno lekkie zapytanie. Import/usunięcie pozycji
+    (data_version) i dopisanie nowego dnia historii (np. nocny `flask history snapshot`)
+    zmieniają klucz. Odczyt niczego nie zapisuje w bazie.
+    """
+
+    def __init__(self, max_size: int = 1000):
+        self._pyramids = LRUCache(max_size)
+        self._keys = {}
+
+    def init_app(self, app):
+        self._pyramids = LRUCache(app.config['CHART_CACHE_MAX_ENTRIES'])
+        self._keys = {}
+        app.extensions['chart_cache'] = self
+
+    def get(self, user_id: int) -> ChartPyramid:
+        version = history_version(user_id)
+        pyramid = self._pyramids.get((user_id, version))
+        if pyramid is not None:
+            return pyramid
+
+        history = ValuationService.get_user_history(user_id)
+        pyramid = ChartPyramid(build_history_pyramid(history))
+        key = (user_id, version)
+        previous = self._keys.get(user_id)
+        if previous is not None and previous != key:
+            self._pyramids.pop(previous)
+        self._keys[user_id] = key
+        self._pyramids.put(key, pyramid)
+        return pyramid
+
+    def invalidate(self, user_id: int):
+        key = self._keys.pop(user_id, None)
+        if key is not None:
+            self._pyramids.pop(key)
+
+    def clear(self):
+        self._pyramids.clear()
+        self._keys.clear()
+
+    def stats(self) -> Dict[str, any]:
+        return self._pyramids.stats()
+
+
+def history_version(user_id: int) -> Tuple:
+    """Wersja historii użytkownika: (id portfela, data_version, ostatni dzień historii) per portfel."""
+    return tuple(db.session.execute(
+        select(Portfolio.id, Portfolio.data_version, func.max(PortfolioHistory.date))
+        .outerjoin(PortfolioHistory, PortfolioHistory.portfolio_id == Portfolio.id)
+        .where(Portfolio.user_id == user_id)
+        .group_by(Portfolio.id, Portfolio.data_version)
+        .order_by(Portfolio.id)
+    ).tuples())
+
+
+chart_cache = ChartPyramidCache()
@@ -1,52 +1,78 @@
-import pandas as pd
-from typing import Dict, List
+from __future__ import annotations
 
+from typing import Dict, List, Optional
+from ..lazy import lazy_import
 
-def build_current_value_timeseries(df: pd.DataFrame, freq: str = "D") -> Dict[str, List]:
-    """
-    Generuje dane do wykresu liniowego wartości portfela w czasie.
-    Zwraca słownik z listami: labels (daty), values (wartość bieżąca), costs (zainwestowany kapitał).
-    """
-    if df is None or df.empty:
-        return {"labels": [], "values": [], "costs": []}
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
 
-    # Szukamy kolumny z datą
-    date_col = None
-    candidates = ["purchase_date", "Data_Zakupu", "Data", "date"]
-    for c in candidates:
-        if c in df.columns:
-            date_col = c
-            break
 
-    if not date_col:
-        return {"labels": [], "values": []}
+# Częstotliwości wykresu wartości (?freq=) -> reguła resample pandas
+CHART_FREQUENCIES = {'D': 'D', 'W': 'W-MON', 'M': 'ME', 'Q': 'QE'}
 
-    # Kopiujemy i konwertujemy typy danych
-    work = df.copy()
-    work[date_col] = pd.to_datetime(work[date_col], errors="coerce")
-    work["current_value"] = pd.to_numeric(work["current_value"], errors="coerce").fillna(0)
 
-    # Konwersja ilości i ceny zakupu
-    work["quantity"] = pd.to_numeric(work["quantity"], errors="coerce").fillna(0)
-    work["purchase_price"] = pd.to_numeric(work["purchase_price"], errors="coerce").fillna(0)
+def build_history_pyramid(history: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Wszystkie poziomy wykresu naraz (klucze jak CHART_FREQUENCIES): dzienny z historii,
+    tygodniowy i miesięczny z dziennego, kwartalny z miesięcznego - ostatnia wartość okresu.
+    """
+    daily = history.set_index("date")[["total_value", "invested_value"]]
+    if daily.empty:
+        return dict.fromkeys(CHART_FREQUENCIES, daily)
+    monthly = daily.resample(CHART_FREQUENCIES['M']).last().dropna()
+    return {
+        'D': daily,
+        'W': daily.resample(CHART_FREQUENCIES['W']).last().dropna(),
+        'M': monthly,
+        'Q': monthly.resample(CHART_FREQUENCIES['Q']).last().dropna(),
+    }
 
-    # Obliczamy koszt (invested capital) dla każdej pozycji
-    work["invested_val"] = work["quantity"] * work["purchase_price"]
 
-    # Grupujemy po dacie i sumujemy
-    daily = work.groupby(date_col)[["current_value", "invested_val"]].sum().sort_index()
+def timeseries_payload(ts: pd.DataFrame, max_points: Optional[int] = None) -> Dict[str, List]:
+    """Szereg (indeks dat, total_value, invested_value) -> labels / values / costs, najwyżej max_points punktów."""
+    if max_points is not None and len(ts) > max_points:
+        ts = ts.iloc[lttb_indices(ts["total_value"].to_numpy(), max_points)]
 
-    if daily.empty:
-        return {"labels": [], "values": [], "costs": []}
+    labels = ts.index.strftime('%Y-%m-%d').tolist()
+    values = ts["total_value"].round(2).tolist()
+    costs = ts["invested_value"].round(2).tolist()
+
+    return {"labels": labels, "values": values, "costs": costs}
 
-    # Resampling (uzupełnienie brakujących dni metodą forward fill)
-    ts = daily.asfreq(freq, method='ffill').fillna(0)
 
-    labels = [d.strftime('%Y-%m-%d') for d in ts.index]
-    values = ts["current_value"].round(2).tolist()
-    costs = ts["invested_val"].round(2).tolist()
+def lttb_indices(values: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Indeksy punktów wybranych algorytmem Largest-Triangle-Three-Buckets.
 
-    return {"labels": labels, "values": values, "costs": costs}
+    Pierwszy i ostatni punkt zostają, pozostałe są dzielone na max_points - 2 kubełki;
+    z każdego brany jest punkt tworzący największy trójkąt z punktem wybranym
+    w poprzednim kubełku i średnią następnego - kształt wykresu (szczyty, spadki)
+    zostaje zachowany. Oś X to kolejne indeksy (punkty w równych odstępach).
+    """
+    n = len(values)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    values = np.asarray(values, dtype='float64')
+    bucket = (n - 2) / (max_points - 2)
+    # Granice kubełków: kubełek i to [edges[i], edges[i + 1]), ostatni "następny" to sam punkt końcowy
+    edges = (np.arange(max_points - 1) * bucket).astype(np.int64) + 1
+    edges[-1] = n - 1
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(max_points - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = (stop + next_stop - 1) / 2
+        next_y = values[stop:next_stop].mean()
+        x = np.arange(start, stop)
+        area = np.abs((previous - next_x) * (values[start:stop] - values[previous])
+                      - (previous - x) * (next_y - values[previous]))
+        previous = start + int(area.argmax())
+        selected[i + 1] = previous
+    return selected
 
 
 def build_allocation_pie_data(df: pd.DataFrame, group_by_candidates: List[str] = None,
@@ -67,12 +93,11 @@ def build_allocation_pie_data(df: pd.DataFrame, group_by_candidates: List[str] =
     if not group_col:
         return {"labels": [], "values": []}
 
-    work = df.copy()
-    work[value_column] = pd.to_numeric(work[value_column], errors="coerce").fillna(0)
-    work[group_col] = work[group_col].fillna("Inne")
+    values = _as_float(df[value_column]).fillna(0)
+    groups = _fill_label(df[group_col], "Inne")
 
     # Agregacja i sortowanie
-    agg = work.groupby(group_col)[value_column].sum().sort_values(ascending=False)
+    agg = values.groupby(groups, observed=True).sum().sort_values(ascending=False)
 
     labels = agg.index.astype(str).tolist()
     values = agg.round(2).tolist()
@@ -80,46 +105,18 @@ def build_allocation_pie_data(df: pd.DataFrame, group_by_candidates: List[str] =
     return {"labels": labels, "values": values}
 
 
-def build_market_structure_pie_data(df: pd.DataFrame) -> Dict[str, List]:
-    """
-    Generuje dane do wykresu kołowego z podziałem na Rynek (Skarbowe vs Korporacyjne).
-    Klasyfikuje obligacje na podstawie emitenta i serii.
-    """
-    if df is None or df.empty:
-        return {"labels": [], "values": []}
-
-    work = df.copy()
-    work['current_value'] = pd.to_numeric(work['current_value'], errors='coerce').fillna(0)
-
-    # Funkcja pomocnicza do klasyfikacji
-    def classify(row):
-        issuer = str(row.get('issuer', '')).lower()
-        series = str(row.get('series', '')).upper()
-        b_type = str(row.get('bond_type', '')).lower()
+def _as_float(values: pd.Series) -> pd.Series:
+    """Kolumna jako float64 - bez kopii i konwersji, gdy już ma ten typ (ramka typowana)."""
+    if pd.api.types.is_float_dtype(values):
+        return values
+    return pd.to_numeric(values, errors="coerce").astype("float64")
 
-        # 1. Sprawdzenie po emitencie (Skarb Państwa)
-        if 'skarb' in issuer or 'minister' in issuer:
-            return 'Skarbowe'
 
-        # 2. Sprawdzenie po typowych seriach detalicznych obligacji skarbowych
-        treasury_prefixes = ['OTS', 'DOS', 'TOZ', 'COI', 'EDO', 'ROR', 'DOR', 'SP', 'DS', 'WS', 'PS']
-        if any(series.startswith(p) for p in treasury_prefixes):
-            return 'Skarbowe'
-
-        # 3. Jeśli to nie Skarb, sprawdzamy typ lub zakładamy Korporacyjne
-        if 'korporac' in b_type:
-            return 'Korporacyjne'
-
-        # Domyślna kategoria dla reszty
-        return 'Korporacyjne'
-
-    # Zastosowanie klasyfikacji
-    work['market_category'] = work.apply(classify, axis=1)
-
-    # Agregacja
-    agg = work.groupby('market_category')['current_value'].sum().sort_values(ascending=False)
-
-    return {
-        "labels": agg.index.astype(str).tolist(),
-        "values": agg.round(2).tolist()
-    }
\ No newline at end of file
+def _fill_label(values: pd.Series, label: str) -> pd.Series:
+    """fillna(label) działające także dla kolumn category (etykieta dopisywana do kategorii)."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        if not values.isna().any():
+            return values
+        if label not in values.cat.categories:
+            values = values.cat.add_categories([label])
+    return values.fillna(label)
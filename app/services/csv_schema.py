@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Dict, List, Optional
+from ..lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+# Pola logiczne importu i kandydaci nazw kolumn w plikach z różnych biur maklerskich
+# (kolejność = priorytet, tak jak przy dawnym sprawdzaniu komórka po komórce)
+IMPORT_FIELDS = {
+    'isin': ['Kod_ISIN', 'isin', 'kod_isin'],
+    'tx_ref': ['Numer_Transakcji', 'numer_transakcji', 'id_operacji'],
+    'qty': ['ilosc', 'Liczba', 'quantity'],
+    'price': ['Cena_Zakupu', 'cena', 'price'],
+    'curr_val': ['Aktualna_Wartosc', 'Wartosc', 'current_value'],
+    'date': ['Data_Zakupu', 'Data', 'date'],
+    'name': ['Nazwa', 'Papier', 'name'],
+    'series': ['Seria_Obligacji', 'Seria', 'series'],
+    'bond_type': ['Typ_Obligacji', 'Typ', 'type'],
+    'maturity_date': ['Data_Wykupu', 'Maturity'],
+    'emission_date': ['Data_Emisji', 'Emission'],
+    'coupon': ['Oprocentowanie', 'Coupon'],
+}
+
+# Wartości domyślne dla pustych / nieczytelnych liczb
+NUMBER_DEFAULTS = {'qty': 1.0, 'price': 100.0, 'curr_val': 0.0}
+
+# Formaty dat sprawdzane przy wykrywaniu formatu pliku (polskie najpierw)
+DATE_FORMATS = ['%d.%m.%Y', '%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%d.%m.%y', '%Y/%m/%d', '%Y-%m-%d %H:%M:%S']
+
+# Ile niepustych wartości bierzemy do wykrycia formatu daty
+_DATE_SAMPLE_SIZE = 50
+
+
+class CsvImportSchema:
+    """
+    Mapowanie kolumn pliku CSV na pola logiczne importu.
+
+    Kolumny źródłowe są wybierane raz na plik (przy pierwszej porcji), a parsowanie
+    liczb i dat odbywa się na całych kolumnach (Series) zamiast komórka po komórce.
+    Wykryty format daty jest zapamiętywany i używany dla kolejnych porcji.
+    """
+
+    def __init__(self, columns):
+        present = set(columns)
+        self.sources = {
+            field: [c for c in candidates if c in present]
+            for field, candidates in IMPORT_FIELDS.items()
+        }
+        self._date_formats = {}
+
+    def normalize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Zwraca DataFrame z polami logicznymi (kolumny jak klucze IMPORT_FIELDS).
+        Wiersze bez kodu ISIN są pomijane, indeks pozostaje jak w pliku.
+        """
+        isin = self._text(df, 'isin')
+        df = df[isin.notna()]
+        out = pd.DataFrame({'isin': isin[isin.notna()]}, index=df.index)
+
+        for field in ('tx_ref', 'name', 'series', 'bond_type'):
+            out[field] = self._text(df, field)
+        for field, default in NUMBER_DEFAULTS.items():
+            out[field] = self._number(df, field).fillna(default)
+        # Data z pliku (None gdy brak) - do odcisku; brak daty zakupu to dzień importu
+        out['source_date'] = self._date(df, 'date')
+        out['date'] = out['source_date'].fillna(date.today())
+        out['maturity_date'] = self._date(df, 'maturity_date')
+        out['emission_date'] = self._date(df, 'emission_date')
+
+        coupon_text = self._text(df, 'coupon')
+        coupon = self._number(df, 'coupon').fillna(0.0) / 100.0
+        out['coupon'] = coupon.where(coupon_text.notna())
+
+        # Domyślne wartości definicji obligacji
+        out['name'] = out['name'].fillna(out['isin'])
+        out['series'] = out['series'].fillna(out['isin'])
+        return out
+
+    def _text(self, df: pd.DataFrame, field: str) -> pd.Series:
+        """Pierwsza niepusta wartość spośród kolumn kandydatów (jako tekst bez spacji na brzegach)."""
+        result = pd.Series(None, index=df.index, dtype=object)
+        for col in reversed(self.sources[field]):
+            values = _on_uniques(df[col], _clean_text)
+            result = values.where(values.notna(), result)
+        return result.where(result.notna(), None)
+
+    def _number(self, df: pd.DataFrame, field: str) -> pd.Series:
+        """Liczby w polskim formacie ("1 234,50 zł", "6,8%") -> float64 (NaN gdy brak/błąd)."""
+        result = pd.Series(float('nan'), index=df.index)
+        for col in reversed(self.sources[field]):
+            raw = df[col]
+            if pd.api.types.is_numeric_dtype(raw):
+                values = raw.astype('float64')
+            else:
+                values = _on_uniques(raw, _clean_number).astype('float64')
+            result = values.where(values.notna(), result)
+        return result
+
+    def _date(self, df: pd.DataFrame, field: str) -> pd.Series:
+        """Daty -> obiekty datetime.date (None gdy brak/błąd). Format wykrywany raz i zapamiętywany."""
+        text = self._text(df, field)
+        if text.isna().all():
+            return pd.Series(None, index=df.index, dtype=object)
+
+        fmt = self._date_formats.get(field)
+        if fmt is None:
+            fmt = self._date_formats[field] = _infer_date_format(text.dropna())
+
+        return _on_uniques(text, lambda values: _parse_dates(values, fmt))
+
+
+def _on_uniques(values: pd.Series, parse) -> pd.Series:
+    """
+    Stosuje parse (operację na całej Series) tylko do unikalnych wartości kolumny.
+    W plikach maklerskich ceny, daty i kody ISIN mocno się powtarzają, więc to
+    wielokrotnie mniej pracy niż przetwarzanie każdej komórki.
+    """
+    codes, uniques = pd.factorize(values)
+    parsed = parse(pd.Series(uniques, dtype=object)).to_numpy(dtype=object)
+    # Brakujące wartości mają kod -1 - wskazuje on na dopisany na końcu None
+    parsed = np.append(parsed, None)
+    return pd.Series(parsed.take(codes), index=values.index, dtype=object)
+
+
+def _clean_text(values: pd.Series) -> pd.Series:
+    text = values.astype(str).str.strip()
+    return text.where(text != '', None)
+
+
+def _clean_number(values: pd.Series) -> pd.Series:
+    clean = (values.astype(str)
+             .str.replace(r'\s|zł|%', '', regex=True)
+             .str.replace(',', '.', regex=False))
+    return pd.to_numeric(clean, errors='coerce')
+
+
+def _parse_dates(values: pd.Series, fmt: str) -> pd.Series:
+    # Najpierw wykryty format pliku, potem pozostałe znane formaty, na końcu parsowanie elastyczne
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    for candidate in [fmt] + [f for f in DATE_FORMATS if f != fmt]:
+        leftover = parsed.isna()
+        if not leftover.any():
+            break
+        if candidate:
+            parsed[leftover] = pd.to_datetime(values[leftover], format=candidate, errors='coerce')
+    leftover = parsed.isna()
+    if leftover.any():
+        parsed[leftover] = pd.to_datetime(values[leftover], format='mixed', dayfirst=True, errors='coerce')
+    return pd.Series(parsed.dt.date, index=values.index, dtype=object).where(parsed.notna(), None)
+
+
+def _infer_date_format(values: pd.Series) -> Optional[str]:
+    """Zwraca pierwszy format z DATE_FORMATS pasujący do całej próbki albo '' gdy żaden nie pasuje."""
+    sample = values.head(_DATE_SAMPLE_SIZE)
+    for fmt in DATE_FORMATS:
+        if pd.to_datetime(sample, format=fmt, errors='coerce').notna().all():
+            return fmt
+    return ''
+
+
+# Pola znormalizowanego wiersza wchodzące do odcisku (fingerprint). Data sprzed uzupełnienia
+# dniem importu - wiersz bez daty ma ten sam odcisk przy ponownym wgraniu w inny dzień.
+FINGERPRINT_FIELDS = ['isin', 'tx_ref', 'source_date', 'qty', 'price', 'curr_val']
+
+
+class RowFingerprinter:
+    """
+    Liczy 64-bitowe odciski znormalizowanych wierszy importu.
+
+    Odcisk obejmuje też numer wystąpienia identycznego wiersza w pliku - dwa takie
+    same zakupy w jednym pliku dostają różne odciski, a ponowne wgranie tego samego
+    pliku daje dokładnie te same. Liczniki wystąpień są przenoszone między porcjami.
+    """
+
+    def __init__(self):
+        self._seen = pd.Series(dtype='int64')
+
+    def fingerprints(self, rows: pd.DataFrame) -> pd.Series:
+        base = pd.util.hash_pandas_object(rows[FINGERPRINT_FIELDS], index=False)
+        occurrence = base.groupby(base).cumcount() + base.map(self._seen).fillna(0).astype('int64')
+        self._seen = self._seen.add(base.value_counts(), fill_value=0).astype('int64')
+
+        combined = pd.DataFrame({'base': base.to_numpy(), 'occurrence': occurrence.to_numpy()})
+        hashed = pd.util.hash_pandas_object(combined, index=False).to_numpy()
+        # BIGINT w bazie jest ze znakiem - ten sam układ bitów jako int64
+        return pd.Series(hashed.view('int64'), index=rows.index)
+
+
+def frame_records(df: pd.DataFrame, columns: List[str]) -> List[Dict]:
+    """Wiersze DataFrame jako słowniki z natywnymi typami Pythona (NaN -> None) - do masowego zapisu."""
+    work = df[columns].astype(object)
+    return work.where(work.notna(), None).to_dict('records')
@@ -1,5 +1,10 @@
-import pandas as pd
+from __future__ import annotations
+
+from typing import BinaryIO, Iterator, Union
 from werkzeug.datastructures import FileStorage
+from ..lazy import lazy_import
+
+pd = lazy_import('pandas')
 
 
 class CsvService:
@@ -9,4 +14,35 @@ class CsvService:
         Odczytuje plik CSV przyjmując kodowanie UTF-8.
         """
         file.seek(0)
-        return pd.read_csv(file, header=0, encoding='utf-8')
\ No newline at end of file
+        return pd.read_csv(file, header=0, encoding='utf-8')
+
+    @staticmethod
+    def iter_csv_chunks(file: Union[FileStorage, BinaryIO], chunk_size: int = 5000) -> Iterator[pd.DataFrame]:
+        """
+        Odczytuje plik CSV (UTF-8) strumieniowo, porcjami po chunk_size wierszy.
+        Zużycie pamięci zależy od wielkości porcji, a nie od wielkości pliku.
+        Indeks wierszy jest ciągły między porcjami (numeracja jak w całym pliku).
+        """
+        file.seek(0)
+        with pd.read_csv(file, header=0, encoding='utf-8', chunksize=chunk_size) as reader:
+            yield from reader
+
+
+class CsvErrorWriter:
+    """
+    Dopisuje odrzucone wiersze importu do pliku CSV: oryginalne kolumny,
+    numer wiersza w pliku i opis błędu. Plik powstaje przy pierwszym błędzie.
+    """
+    ROW_COLUMN = 'Wiersz'
+    ERROR_COLUMN = 'Blad'
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows_written = 0
+
+    def write(self, rows: pd.DataFrame, messages: pd.Series):
+        out = rows.copy()
+        out.insert(0, self.ROW_COLUMN, rows.index)
+        out[self.ERROR_COLUMN] = messages.reindex(rows.index).to_numpy()
+        out.to_csv(self.path, mode='a', header=self.rows_written == 0, index=False, encoding='utf-8')
+        self.rows_written += len(out)
@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+from datetime import date
+from decimal import Decimal
+from typing import Iterator, List
+
+from sqlalchemy import select
+
+from app.models.portfolio import Portfolio
+from app.models.bond_definition import BondDefinition
+from app.models.holding import Holding
+from app.models.transaction import Transaction
+from .. import db
+
+# Obsługiwane formaty eksportu: rozszerzenie -> typ MIME
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class ExportService:
+    """
+    Strumieniowy eksport pozycji i historii transakcji.
+
+    Wiersze są czytane porcjami przez kursor po stronie serwera (stream_results),
+    a każda porcja jest od razu serializowana i wysyłana - pamięć nie zależy
+    od liczby wierszy, a nagłówek trafia do klienta przed pierwszym zapytaniem.
+    """
+
+    @staticmethod
+    def holdings_select(user_id: int):
+        return select(
+            Holding.id.label('holding_id'),
+            BondDefinition.isin.label('isin'),
+            BondDefinition.series.label('series'),
+            BondDefinition.bond_type.label('bond_type'),
+            BondDefinition.maturity_date.label('maturity_date'),
+            Holding.quantity.label('quantity'),
+            Holding.purchase_price.label('purchase_price'),
+            Holding.purchase_date.label('purchase_date'),
+            Holding.current_value.label('current_value'),
+        ).select_from(Portfolio) \
+            .join(Holding, Portfolio.id == Holding.portfolio_id) \
+            .join(BondDefinition, Holding.bond_definition_id == BondDefinition.id) \
+            .where(Portfolio.user_id == user_id) \
+            .order_by(Holding.id)
+
+    @staticmethod
+    def transactions_select(user_id: int):
+        return select(
+            Transaction.id.label('transaction_id'),
+            Transaction.transaction_date.label('transaction_date'),
+            Transaction.transaction_type.label('transaction_type'),
+            BondDefinition.isin.label('isin'),
+            BondDefinition.series.label('series'),
+            Transaction.quantity.label('quantity'),
+            Transaction.price.label('price'),
+            Transaction.fees.label('fees'),
+            Transaction.transaction_reference.label('transaction_reference'),
+        ).select_from(Portfolio) \
+            .join(Transaction, Portfolio.id == Transaction.portfolio_id) \
+            .join(BondDefinition, Transaction.bond_definition_id == BondDefinition.id) \
+            .where(Portfolio.user_id == user_id) \
+            .order_by(Transaction.id)
+
+    @staticmethod
+    def stream(statement, fmt: str, batch_size: int = 2000) -> Iterator[str]:
+        """Generator kolejnych fragmentów pliku (CSV lub NDJSON) dla zapytania."""
+        columns = [c.name for c in statement.selected_columns]
+        if fmt == 'csv':
+            yield _csv_lines([columns])
+
+        result = db.session.execute(statement.execution_options(stream_results=True, yield_per=batch_size))
+        try:
+            for batch in result.partitions():
+                if fmt == 'csv':
+                    yield _csv_lines(batch)
+                else:
+                    yield ''.join(
+                        json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False) + '\n'
+                        for row in batch
+                    )
+        finally:
+            result.close()
+
+
+def _csv_lines(rows: List) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerows(rows)
+    return buffer.getvalue()
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Nieobsługiwany typ: {type(value).__name__}")
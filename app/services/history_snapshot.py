@@ -0,0 +1,91 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from .valuation_service import snapshot_portfolios, stale_portfolios
+from .. import db
+
+logger = logging.getLogger(__name__)
+
+# Silnik bazy w procesie roboczym (tworzony raz, w initializerze puli)
+_worker_engine = None
+
+
+def run_snapshot(until: date, workers: int = 1, batch_size: int = 500,
+                 portfolio_ids: Optional[Sequence[int]] = None,
+                 progress: Optional[Callable[[int, int], None]] = None) -> Tuple[int, int]:
+    """
+    Nocny zapis wyceny wszystkich portfeli do portfolio_history (do dnia `until` włącznie).
+
+    Portfele z brakującymi dniami są dzielone na porcje po `batch_size` (kolejne id);
+    każda porcja to jedno zapytanie o partie, wycena NumPy, upsert i osobny commit.
+    Przy workers > 1 porcje liczy pula procesów (każdy z własnym połączeniem do bazy).
+    Przerwany przebieg wystarczy uruchomić ponownie - zatwierdzone porcje mają już
+    historię do `until` i są pomijane, a upsert nadpisuje ewentualnie powtórzone dni.
+    Wymaga kontekstu aplikacji; zwraca (liczba portfeli, liczba zapisanych dni).
+    """
+    stale = stale_portfolios(db.session, until, portfolio_ids=portfolio_ids)
+    db.session.remove()
+    batches = [stale[i:i + batch_size] for i in range(0, len(stale), batch_size)]
+    if not batches:
+        return 0, 0
+
+    done = 0
+    written = 0
+    workers = min(workers, len(batches))
+    if workers <= 1:
+        for batch in batches:
+            written += _snapshot_batch(batch, until, session=db.session)
+            done += len(batch)
+            if progress:
+                progress(done, len(stale))
+        return done, written
+
+    # Procesy potomne nie mogą współdzielić połączeń rodzica; 'spawn' - bez dziedziczenia
+    # stanu procesu (wątki, otwarte połączenia), każdy worker tworzy własny silnik
+    database_url = db.engine.url.render_as_string(hide_password=False)
+    db.engine.dispose()
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(database_url,)) as pool:
+        futures = {pool.submit(_snapshot_batch, batch, until): len(batch) for batch in batches}
+        for future in as_completed(futures):
+            written += future.result()
+            done += futures[future]
+            if progress:
+                progress(done, len(stale))
+    return done, written
+
+
+def _init_worker(database_url: str):
+    global _worker_engine
+    # Bez create_app - mapowania relacji wymagają zaimportowania wszystkich modeli
+    from ..models import import_models
+    import_models()
+    # Proces roboczy wykonuje jedną porcję naraz - jedno połączenie wystarczy
+    options = {} if database_url.startswith('sqlite') else {'pool_size': 1, 'max_overflow': 0, 'pool_pre_ping': True}
+    _worker_engine = create_engine(database_url, **options)
+
+
+def _snapshot_batch(batch: List[Tuple[int, Optional[date]]], until: date,
+                    session: Optional[Session] = None) -> int:
+    """Jedna porcja portfeli w osobnej transakcji (w procesie roboczym - własna sesja)."""
+    own_session = session is None
+    if own_session:
+        session = Session(bind=_worker_engine)
+    try:
+        written = snapshot_portfolios(session, batch, until)
+        session.commit()
+        return written
+    except Exception:
+        session.rollback()
+        logger.exception("Zapis historii dla portfeli %d-%d nie powiódł się", batch[0][0], batch[-1][0])
+        raise
+    finally:
+        if own_session:
+            session.close()
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select
+
+from app.models.portfolio import Portfolio
+from app.models.bond_definition import BondDefinition
+from app.models.holding import Holding
+from .. import db
+from ..lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+# Dozwolone kolumny sortowania (parametr ?sort=) -> kolumna SQL
+SORT_COLUMNS = {
+    'id': Holding.id,
+    'purchase_date': Holding.purchase_date,
+    'maturity_date': BondDefinition.maturity_date,
+    'series': BondDefinition.series,
+    'bond_type': BondDefinition.bond_type,
+    'quantity': Holding.quantity,
+    'purchase_price': Holding.purchase_price,
+    'current_value': Holding.current_value,
+}
+
+# Filtry (parametry zapytania) obsługiwane przez get_page
+FILTER_FIELDS = ['bond_type', 'series', 'isin', 'maturity_from', 'maturity_to']
+
+MAX_PAGE_SIZE = 500
+
+
+class HoldingsService:
+    """
+    Stronicowanie pozycji portfela po stronie bazy (keyset pagination).
+
+    Kolejna strona zaczyna się za ostatnim wierszem poprzedniej (kursor = wartość
+    sortowania + id pozycji) - bez OFFSET i bez wczytywania całego portfela.
+    W jednym portfelu koszt strony zależy od jej rozmiaru przy sortowaniu po dacie zakupu
+    (indeks (portfolio_id, purchase_date, id)) i po id (indeks na portfolio_id - InnoDB
+    dokłada do niego klucz główny, więc pozycje portfela są w nim uporządkowane po id).
+    Pozostałe kolumny (i kilka portfeli naraz) wymagają posortowania pasujących pozycji w bazie.
+    Puste wartości kolumny sortowania (tylko kolumny dopuszczające NULL) są zawsze na końcu.
+    """
+
+    @staticmethod
+    def get_page(user_id: int, filters: Dict[str, Any], sort: str = 'id', descending: bool = False,
+                 cursor: Optional[str] = None, limit: int = 100) -> Tuple[pd.DataFrame, Optional[str]]:
+        """
+        Zwraca (ramka pozycji strony, kursor następnej strony lub None).
+        Kolumny ramki jak w PortfolioService.get_user_portfolio_df (bez name/issuer).
+        """
+        sort_column = SORT_COLUMNS.get(sort, Holding.id)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        portfolio_ids = db.session.execute(
+            select(Portfolio.id).where(Portfolio.user_id == user_id)
+        ).scalars().all()
+        query = _filtered_select(portfolio_ids, filters, sort_column)
+        position = decode_cursor(cursor, sort_column)
+        if position is not None:
+            query = query.where(_after(sort_column, descending, *position))
+
+        ordering = [Holding.id.desc() if descending else Holding.id]
+        if sort_column is not Holding.id:
+            ordering.insert(0, sort_column.desc() if descending else sort_column)
+            if _nullable(sort_column):
+                ordering.insert(0, sort_column.is_(None))
+        result = db.session.execute(query.order_by(*ordering).limit(limit + 1))
+        df = pd.DataFrame(result.all(), columns=list(result.keys()))
+
+        next_cursor = None
+        if len(df) > limit:
+            df = df.iloc[:limit]
+            last = df.iloc[-1]
+            next_cursor = encode_cursor(last['sort_value'], int(last['holding_id']))
+        return df.drop(columns='sort_value'), next_cursor
+
+
+def parse_filters(args) -> Dict[str, Any]:
+    """Filtry z parametrów żądania (puste i niepoprawne wartości są pomijane)."""
+    filters = {}
+    for field in ('bond_type', 'series', 'isin'):
+        value = (args.get(field) or '').strip()
+        if value:
+            filters[field] = value.upper()
+    for field in ('maturity_from', 'maturity_to'):
+        try:
+            filters[field] = date.fromisoformat(args.get(field, ''))
+        except ValueError:
+            pass
+    return filters
+
+
+def encode_cursor(value, holding_id: int) -> str:
+    if pd.isna(value):
+        value = None
+    elif isinstance(value, date):
+        value = value.isoformat()
+    elif not isinstance(value, str):
+        value = str(value)
+    raw = json.dumps([value, holding_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str], sort_column) -> Optional[Tuple[Any, int]]:
+    """(wartość sortowania, id) z kursora albo None, gdy brak / kursor uszkodzony (pierwsza strona)."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, holding_id = json.loads(raw)
+        if value is not None:
+            python_type = sort_column.type.python_type
+            if python_type is date:
+                value = date.fromisoformat(value)
+            elif python_type is Decimal:
+                value = Decimal(value)
+            elif python_type is int:
+                value = int(value)
+        return value, int(holding_id)
+    except (ValueError, TypeError, InvalidOperation):
+        return None
+
+
+def _filtered_select(portfolio_ids: List[int], filters: Dict[str, Any], sort_column):
+    # Warunek równości na portfolio_id (typowo jeden portfel) - indeks wyznacza kolejność
+    query = select(
+        Holding.id.label('holding_id'),
+        BondDefinition.isin.label('isin'),
+        BondDefinition.series.label('series'),
+        BondDefinition.bond_type.label('bond_type'),
+        BondDefinition.maturity_date.label('maturity_date'),
+        BondDefinition.emission_date.label('emission_date'),
+        BondDefinition.coupon_rate.label('coupon_rate'),
+        BondDefinition.nominal_value.label('nominal_value'),
+        Holding.quantity.label('quantity'),
+        Holding.purchase_price.label('purchase_price'),
+        Holding.purchase_date.label('purchase_date'),
+        Holding.current_value.label('current_value'),
+        Holding.transaction_reference.label('transaction_reference'),
+        sort_column.label('sort_value'),
+    ).select_from(Holding) \
+        .join(BondDefinition, Holding.bond_definition_id == BondDefinition.id) \
+        .where(_in_portfolios(portfolio_ids), *filter_conditions(filters))
+    return query
+
+
+def _in_portfolios(portfolio_ids: List[int]):
+    if len(portfolio_ids) == 1:
+        return Holding.portfolio_id == portfolio_ids[0]
+    return Holding.portfolio_id.in_(portfolio_ids)
+
+
+def filter_conditions(filters: Dict[str, Any]) -> List:
+    """Warunki WHERE dla filtrów z parse_filters (wymagają złączenia z BondDefinition)."""
+    conditions = []
+    if 'bond_type' in filters:
+        conditions.append(BondDefinition.bond_type == filters['bond_type'])
+    if 'series' in filters:
+        conditions.append(BondDefinition.series.startswith(filters['series'], autoescape=True))
+    if 'isin' in filters:
+        conditions.append(BondDefinition.isin.startswith(filters['isin'], autoescape=True))
+    if 'maturity_from' in filters:
+        conditions.append(BondDefinition.maturity_date >= filters['maturity_from'])
+    if 'maturity_to' in filters:
+        conditions.append(BondDefinition.maturity_date <= filters['maturity_to'])
+    return conditions
+
+
+def _after(sort_column, descending: bool, value, holding_id: int):
+    """Warunek "za kursorem" zgodny z kolejnością (NULL na końcu, id jako rozstrzygnięcie remisów)."""
+    beyond_id = Holding.id < holding_id if descending else Holding.id > holding_id
+    if sort_column is Holding.id:
+        return beyond_id
+    nullable = _nullable(sort_column)
+    if value is None:
+        return and_(sort_column.is_(None), beyond_id) if nullable else beyond_id
+    beyond_value = sort_column < value if descending else sort_column > value
+    after = or_(beyond_value, and_(sort_column == value, beyond_id))
+    # Kolumny NOT NULL bez "OR ... IS NULL" - warunek zakresu na indeksie
+    return or_(after, sort_column.is_(None)) if nullable else after
+
+
+def _nullable(sort_column) -> bool:
+    return sort_column.expression.nullable
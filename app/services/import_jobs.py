@@ -0,0 +1,203 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from werkzeug.datastructures import FileStorage
+
+from .csv_service import CsvService, CsvErrorWriter
+from .portfolio_service import PortfolioService
+from .. import db
+
+
+class ImportJob:
+    """Stan pojedynczego importu CSV wykonywanego w tle."""
+
+    def __init__(self, user_id: int, path: str, partial: bool = False):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.path = path
+        # Tryb częściowy: zatwierdzanie co IMPORT_COMMIT_EVERY wierszy, błędne wiersze do pliku błędów
+        self.partial = partial
+        self.error_file = f"{os.path.splitext(path)[0]}-errors.csv"
+        self.error_rows = 0
+        self.status = 'queued'  # queued -> running -> done / failed
+        self.rows_total = None
+        self.rows_done = 0
+        self.error_count = 0
+        self.imported = 0
+        self.duplicate_file = False
+        self.errors = []
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def advance(self, rows_done: int, error_count: int):
+        """Callback postępu wywoływany przez importer po każdej porcji."""
+        self.rows_done = rows_done
+        self.error_count = error_count
+
+    def has_error_file(self) -> bool:
+        return self.status in ('done', 'failed') and os.path.exists(self.error_file)
+
+    def eta_seconds(self) -> Optional[float]:
+        if self.status != 'running' or not self.rows_done or not self.rows_total:
+            return None
+        elapsed = time.time() - self.started_at
+        remaining = max(self.rows_total - self.rows_done, 0)
+        return round(elapsed / self.rows_done * remaining, 1)
+
+    def to_dict(self) -> Dict[str, any]:
+        return {
+            'id': self.id,
+            'status': self.status,
+            'rows_done': self.rows_done,
+            'rows_total': self.rows_total,
+            'imported': self.imported,
+            'duplicate_file': self.duplicate_file,
+            'error_count': self.error_count,
+            'error_rows': self.error_rows,
+            'has_error_file': self.has_error_file(),
+            'errors': self.errors[:10],
+            'eta_seconds': self.eta_seconds(),
+        }
+
+
+class ImportJobQueue:
+    """
+    Kolejka importów CSV wykonywanych w tle przez ograniczoną pulę wątków.
+
+    Plik jest zapisywany na dysk (spool) w wątku żądania, a sam import wykonuje
+    PortfolioService.import_csv_data w puli. Kolejka jest lokalna dla procesu -
+    zastępuje prawdziwego brokera zadań przy wdrożeniu jednoserwerowym.
+    """
+
+    def __init__(self):
+        self._app = None
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self._app = app
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config['IMPORT_WORKERS'],
+            thread_name_prefix='csv-import'
+        )
+        app.extensions['import_jobs'] = self
+
+    def submit(self, user_id: int, file: FileStorage, partial: bool = False) -> ImportJob:
+        """
+        Zapisuje plik na dysk i kolejkuje import. Zwraca od razu obiekt zadania.
+        partial=True włącza import z zatwierdzaniem partiami i plikiem błędnych wierszy.
+        """
+        self._prune()
+        with self._lock:
+            pending = sum(1 for j in self._jobs.values() if j.status in ('queued', 'running'))
+        if pending >= self._app.config['IMPORT_QUEUE_LIMIT']:
+            raise RuntimeError("Zbyt wiele importów w kolejce, spróbuj ponownie za chwilę.")
+
+        fd, path = tempfile.mkstemp(prefix='import-', suffix='.csv', dir=self._app.config['IMPORT_SPOOL_DIR'])
+        with os.fdopen(fd, 'wb') as spool:
+            file.save(spool)
+
+        job = ImportJob(user_id, path, partial=partial)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str, user_id: int) -> Optional[ImportJob]:
+        """Zwraca zadanie tylko jeśli należy do danego użytkownika."""
+        job = self._jobs.get(job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        return job
+
+    def _run(self, job: ImportJob):
+        with self._app.app_context():
+            job.status = 'running'
+            job.started_at = time.time()
+            try:
+                with open(job.path, 'rb') as f:
+                    job.rows_total, file_hash = _scan_file(f)
+                    if not job.rows_total:
+                        job.errors = ["Plik CSV jest pusty."]
+                        job.status = 'failed'
+                        return
+
+                    chunks = CsvService.iter_csv_chunks(f, chunk_size=self._app.config['CSV_CHUNK_SIZE'])
+                    result = PortfolioService.import_csv_data(
+                        job.user_id, chunks, progress=job.advance, file_hash=file_hash,
+                        commit_every=self._app.config['IMPORT_COMMIT_EVERY'] if job.partial else None,
+                        error_writer=CsvErrorWriter(job.error_file) if job.partial else None,
+                    )
+
+                job.duplicate_file = result.get('duplicate_file', False)
+                job.imported = result['imported']
+                job.errors = result['errors']
+                job.error_count = len(result['errors'])
+                job.error_rows = result.get('error_rows', 0)
+                job.status = _final_status(job, result)
+            except Exception as e:
+                db.session.rollback()
+                job.errors = [f"Błąd krytyczny: {str(e)[:100]}"]
+                job.status = 'failed'
+            finally:
+                job.finished_at = time.time()
+                try:
+                    os.remove(job.path)
+                except OSError:
+                    pass
+
+    def _prune(self):
+        """Usuwa z pamięci zakończone zadania starsze niż IMPORT_JOB_TTL."""
+        cutoff = time.time() - self._app.config['IMPORT_JOB_TTL']
+        with self._lock:
+            for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+                job = self._jobs.pop(job_id)
+                try:
+                    os.remove(job.error_file)
+                except OSError:
+                    pass
+
+
+def _final_status(job: ImportJob, result: dict) -> str:
+    """
+    Bez błędów - 'done'. W trybie pełnym każdy błąd wycofuje import ('failed'). W trybie
+    częściowym poprawne wiersze są zapisane mimo błędów w innych - także gdy wszystkie były
+    już zaimportowane (pominięte po odcisku); 'failed' tylko gdy import przerwał błąd ogólny
+    przed zapisaniem czegokolwiek albo żaden wiersz nie przeszedł walidacji.
+    """
+    if not result['errors']:
+        return 'done'
+    if not job.partial:
+        return 'failed'
+    if result.get('aborted'):
+        return 'done' if result['imported'] else 'failed'
+    return 'done' if job.rows_done > result.get('error_rows', 0) else 'failed'
+
+
+def _scan_file(f) -> Tuple[int, str]:
+    """
+    Jedno blokowe przejście po pliku: liczba wierszy danych (do szacowania postępu)
+    i SHA-256 zawartości (do pomijania plików już zaimportowanych).
+    """
+    digest = hashlib.sha256()
+    lines = 0
+    last = b''
+    for block in iter(lambda: f.read(1024 * 1024), b''):
+        digest.update(block)
+        lines += block.count(b'\n')
+        last = block
+    if last and not last.endswith(b'\n'):
+        lines += 1
+    f.seek(0)
+    return max(lines - 1, 0), digest.hexdigest()  # bez nagłówka
+
+
+import_jobs = ImportJobQueue()
@@ -1,6 +1,10 @@
-import pandas as pd
+from __future__ import annotations
+
 from datetime import datetime
 import logging
+from ..lazy import lazy_import
+
+pd = lazy_import('pandas')
 
 
 def fetch_poland_cpi_yoy(start: str = None, end: str = None) -> pd.DataFrame:
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, Tuple
+
+from sqlalchemy import select
+
+from app.models.portfolio import Portfolio
+from .cache import LRUCache
+from .. import db
+from ..lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+
+class PortfolioFrameCache:
+    """
+    Cache ramek portfela (wynik PortfolioService.get_user_portfolio_df) per użytkownik.
+
+    Wpis jest ważny tak długo, jak licznik Portfolio.data_version - import i usuwanie
+    pozycji go podbijają, więc sprawdzenie aktualności to jedno lekkie zapytanie
+    zamiast pełnego złączenia. Cache jest ograniczony LRU liczbą wpisów i łącznym
+    rozmiarem ramek w pamięci (PORTFOLIO_CACHE_MAX_BYTES).
+
+    Zwracane ramki są współdzielone między żądaniami - wywołujący nie mogą ich
+    modyfikować w miejscu (kopia przed zmianami, jak w charts_service).
+    """
+
+    def __init__(self, max_size: int = 1000, max_bytes: int = 256 * 1024 * 1024):
+        self._frames = LRUCache(max_size, max_bytes=max_bytes, sizeof=_frame_size)
+        # Ostatnio załadowana wersja per użytkownik - do usuwania nieaktualnych wpisów
+        self._versions = {}
+
+    def init_app(self, app):
+        self._frames = LRUCache(app.config['PORTFOLIO_CACHE_MAX_ENTRIES'],
+                                max_bytes=app.config['PORTFOLIO_CACHE_MAX_BYTES'],
+                                sizeof=_frame_size)
+        self._versions = {}
+        app.extensions['portfolio_cache'] = self
+
+    def get(self, user_id: int, load: Callable[[int], pd.DataFrame]) -> pd.DataFrame:
+        """Ramka z cache, jeśli wersja danych się nie zmieniła; w przeciwnym razie load(user_id)."""
+        key = (user_id, data_version(user_id))
+        df = self._frames.get(key)
+        if df is not None:
+            return df
+
+        df = load(user_id)
+        previous = self._versions.get(user_id)
+        if previous is not None and previous != key:
+            self._frames.pop(previous)
+        self._versions[user_id] = key
+        self._frames.put(key, df)
+        return df
+
+    def invalidate(self, user_id: int):
+        key = self._versions.pop(user_id, None)
+        if key is not None:
+            self._frames.pop(key)
+
+    def clear(self):
+        self._frames.clear()
+        self._versions.clear()
+
+    def stats(self) -> Dict[str, any]:
+        return self._frames.stats()
+
+
+def data_version(user_id: int) -> Tuple:
+    """Wersja danych użytkownika: pary (id portfela, data_version) wszystkich jego portfeli."""
+    return tuple(db.session.execute(
+        select(Portfolio.id, Portfolio.data_version)
+        .where(Portfolio.user_id == user_id)
+        .order_by(Portfolio.id)
+    ).tuples())
+
+
+def _frame_size(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+portfolio_cache = PortfolioFrameCache()
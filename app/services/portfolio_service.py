@@ -1,11 +1,48 @@
+from __future__ import annotations
+
 from app.models.portfolio import Portfolio
 from app.models.bond_definition import BondDefinition
 from app.models.holding import Holding
 from app.models.transaction import Transaction
+from app.models.imported_file import ImportedFile
+from .batching import chunked
+from .bond_catalog import bond_catalog, CATALOG_COLUMNS
+from .portfolio_cache import portfolio_cache
+from .aggregate_service import AggregateService
+from .bond_markets import classify_markets
+from .holdings_service import filter_conditions
+from .valuation_service import ValuationService
+from .typed_frame import typed_frame, FLOAT, INT, DATE, CATEGORY, TEXT
+from .csv_schema import CsvImportSchema, RowFingerprinter, frame_records
+from .csv_service import CsvErrorWriter
 from .. import db
-import pandas as pd
-from typing import Dict, Optional
-from datetime import date
+from sqlalchemy import and_, select, insert, update, delete
+from sqlalchemy.exc import SQLAlchemyError
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+from ..lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+# Ile komunikatów o błędnych wierszach zwracać w wyniku importu (pełna lista trafia do pliku błędów)
+_MAX_ERROR_MESSAGES = 100
+
+# Kolumny ramki zwracanej przez get_user_portfolio_df (w tej kolejności)
+PORTFOLIO_COLUMNS = [
+    'holding_id', 'isin', 'name', 'issuer', 'series', 'bond_type', 'maturity_date', 'emission_date',
+    'coupon_rate', 'nominal_value', 'quantity', 'purchase_price', 'purchase_date', 'current_value',
+    'transaction_reference', 'market_category',
+]
+
+# Zadeklarowane typy kolumn ramki portfela (liczby float64, daty datetime64, teksty słownikowe category)
+PORTFOLIO_DTYPES = {
+    'holding_id': INT, 'bond_definition_id': INT,
+    'isin': CATEGORY, 'name': CATEGORY, 'issuer': CATEGORY, 'series': CATEGORY, 'bond_type': CATEGORY,
+    'market_category': CATEGORY,
+    'maturity_date': DATE, 'emission_date': DATE, 'purchase_date': DATE,
+    'coupon_rate': FLOAT, 'nominal_value': FLOAT, 'quantity': FLOAT, 'purchase_price': FLOAT,
+    'current_value': FLOAT,
+    'transaction_reference': TEXT,
+}
 
 
 class PortfolioService:
@@ -14,18 +51,18 @@ class PortfolioService:
     def get_user_portfolio_df(user_id: int) -> pd.DataFrame:
         """
         Pobiera zagregowane portfolio użytkownika.
+        Kolumny mają typy z PORTFOLIO_DTYPES (bez kolumn Decimal/date typu object).
+        Ramka jest cache'owana per użytkownik do zmiany Portfolio.data_version - nie wolno
+        jej modyfikować w miejscu.
         """
+        return portfolio_cache.get(user_id, PortfolioService._load_portfolio_df)
+
+    @staticmethod
+    def _load_portfolio_df(user_id: int) -> pd.DataFrame:
+        """Z bazy czytane są tylko pozycje - dane obligacji pochodzą z katalogu w pamięci."""
         query = db.session.query(
             Holding.id.label('holding_id'),
-            BondDefinition.isin.label('isin'),
-            BondDefinition.name.label('name'),
-            BondDefinition.issuer.label('issuer'),
-            BondDefinition.series.label('series'),
-            BondDefinition.bond_type.label('bond_type'),
-            BondDefinition.maturity_date.label('maturity_date'),
-            BondDefinition.emission_date.label('emission_date'),
-            BondDefinition.coupon_rate.label('coupon_rate'),
-            BondDefinition.nominal_value.label('nominal_value'),
+            Holding.bond_definition_id.label('bond_definition_id'),
 
             # Dane z holdingu (już zagregowane)
             Holding.quantity.label('quantity'),
@@ -37,10 +74,19 @@ class PortfolioService:
             Holding.transaction_reference.label('transaction_reference'),
         ).select_from(Portfolio) \
             .join(Holding, Portfolio.id == Holding.portfolio_id) \
-            .join(BondDefinition, Holding.bond_definition_id == BondDefinition.id) \
             .filter(Portfolio.user_id == user_id)
 
-        return pd.read_sql(query.statement, con=db.session.get_bind())
+        result = db.session.execute(query.statement)
+        holdings = typed_frame(result.all(), list(result.keys()), PORTFOLIO_DTYPES)
+
+        catalog = bond_catalog.get_many_by_id(holdings['bond_definition_id'].tolist())
+        definitions = typed_frame(
+            ([info[c] for c in CATALOG_COLUMNS] for info in catalog.values()),
+            ['bond_definition_id'] + CATALOG_COLUMNS[1:], PORTFOLIO_DTYPES
+        )
+
+        df = holdings.merge(definitions, on='bond_definition_id', how='inner', sort=False)
+        return df[PORTFOLIO_COLUMNS]
 
     @staticmethod
     def get_or_create_default_portfolio(user_id: int) -> Portfolio:
@@ -52,193 +98,421 @@ class PortfolioService:
         return portfolio
 
     @staticmethod
-    def import_csv_data(user_id: int, df: pd.DataFrame) -> Dict[str, any]:
+    def bump_data_version(portfolio_id: int):
+        """Podbija licznik wersji danych portfela (w bieżącej transakcji, atomowo w SQL)."""
+        db.session.execute(
+            update(Portfolio)
+            .where(Portfolio.id == portfolio_id)
+            .values(data_version=Portfolio.data_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def delete_holdings(user_id: int, holding_ids: Optional[Iterable[int]] = None,
+                        filters: Optional[Dict] = None) -> int:
+        """
+        Usuwa pozycje użytkownika (podane id lub wszystkie spełniające filtry z parse_filters;
+        bez obu - cały portfel) razem z ich transakcjami. Bez commita - całość w jednej transakcji.
+        Znaczniki zaimportowanych plików (ImportedFile) portfeli, z których usunięto transakcje,
+        są kasowane - ten sam plik można wtedy wgrać ponownie.
+
+        Transakcje należą do pozycji przez klucz partii (lot): ta sama obligacja, data zakupu
+        i cena - tak jak scala je import. Ich id są zbierane złączeniem z usuwanymi pozycjami,
+        a usuwanie jest zbiorcze: DELETE ... WHERE id IN (...) porcjami po IN_BATCH_SIZE; agregaty, historia wyceny i data_version są aktualizowane raz na portfel.
+        Zwraca liczbę usuniętych pozycji.
+        """
+        query = select(Holding.id, Holding.portfolio_id, Holding.bond_definition_id,
+                       Holding.current_value, Holding.quantity, Holding.purchase_price, Holding.purchase_date) \
+            .join(Portfolio, Portfolio.id == Holding.portfolio_id) \
+            .where(Portfolio.user_id == user_id)
+        if holding_ids is not None:
+            query = query.where(Holding.id.in_(sorted({int(i) for i in holding_ids})))
+        if filters:
+            query = query.join(BondDefinition, BondDefinition.id == Holding.bond_definition_id) \
+                .where(*filter_conditions(filters))
+
+        ids = []
+        removed = {}
+        earliest = {}
+        for h_id, pid, bd_id, curr_val, qty, price, p_date in db.session.execute(query):
+            ids.append(h_id)
+            removed.setdefault(pid, []).append((bd_id, curr_val, qty, price))
+            earliest[pid] = min(p_date, earliest.get(pid, p_date))
+
+        transaction_ids = []
+        for chunk in chunked(ids):
+            # Transakcje partii: złączenie po kluczu lotu, zawężone do portfeli usuwanych pozycji (idx_portfolio_date)
+            transaction_ids += db.session.execute(
+                select(Transaction.id)
+                .join(Holding, and_(
+                    Holding.portfolio_id == Transaction.portfolio_id,
+                    Holding.bond_definition_id == Transaction.bond_definition_id,
+                    Holding.purchase_date == Transaction.transaction_date,
+                    Holding.purchase_price == Transaction.price,
+                ))
+                .where(Holding.id.in_(chunk), Transaction.portfolio_id.in_(list(removed)))
+            ).scalars().all()
+
+        for chunk in chunked(sorted(set(transaction_ids))):
+            db.session.execute(delete(Transaction).where(Transaction.id.in_(chunk))
+                               .execution_options(synchronize_session=False))
+        for chunk in chunked(ids):
+            db.session.execute(delete(Holding).where(Holding.id.in_(chunk))
+                               .execution_options(synchronize_session=False))
+
+        if transaction_ids:
+            # Plik z usuniętymi transakcjami nie jest już w całości w portfelu - ponowne wgranie
+            # ma go zaimportować (wiersze, które zostały, odrzucą odciski)
+            db.session.execute(delete(ImportedFile).where(ImportedFile.portfolio_id.in_(list(removed)))
+                               .execution_options(synchronize_session=False))
+
+        for pid, holdings in removed.items():
+            AggregateService.apply_deltas(pid, AggregateService.holding_deltas(holdings, sign=-1))
+            ValuationService.truncate_history(pid, since=earliest[pid])
+            PortfolioService.bump_data_version(pid)
+        if removed:
+            # Obcięte dni historii od razu przeliczone (odczyt wykresu niczego nie zapisuje)
+            ValuationService.refresh(user_id)
+        return len(ids)
+
+    @staticmethod
+    def import_csv_data(user_id: int, data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+                        progress: Optional[Callable[[int, int], None]] = None,
+                        file_hash: Optional[str] = None,
+                        commit_every: Optional[int] = None,
+                        error_writer: Optional[CsvErrorWriter] = None) -> Dict[str, any]:
         """
         Importuje dane z CSV, agregując pozycje w Holdings i zapisując historię w Transactions.
+
+        Przyjmuje pojedynczy DataFrame albo strumień kolejnych porcji (np. z
+        CsvService.iter_csv_chunks) - w pamięci jest naraz tylko jedna porcja.
+        Opcjonalny callback progress(wiersze_przetworzone, liczba_błędów) jest
+        wywoływany po każdej porcji.
+        Import działa na zbiorach: definicje obligacji i referencje transakcji są
+        rozwiązywane zapytaniami IN (...), partie scalane w pamięci, a zapis odbywa się
+        masowymi INSERT/UPDATE - liczba zapytań nie rośnie z liczbą wierszy.
+
+        Ponowny import jest idempotentny: plik o znanym file_hash (SHA-256 zawartości)
+        jest pomijany w całości ("duplicate_file": True), a pojedyncze wiersze już
+        zaimportowane rozpoznawane są po odcisku (Transaction.row_fingerprint).
+
+        Domyślnie cały plik to jedna transakcja - błąd w dowolnym wierszu wycofuje import.
+        Z commit_every=N import zatwierdza co N wierszy, każdą partię zapisuje w savepoincie,
+        a błędne wiersze pomija (trafiają do error_writer); poprawne zostają zapisane.
         """
         portfolio = PortfolioService.get_or_create_default_portfolio(user_id)
+        chunks = [data] if isinstance(data, pd.DataFrame) else data
         imported_count = 0
+        imported_committed = 0  # Wiersze zapisane w zatwierdzonych transakcjach
+        aborted = False  # Import przerwany błędem ogólnym (nie błędami pojedynczych wierszy)
+        rows_done = 0
+        error_rows = 0
         errors = []
 
-        try:
-            for index, row in df.iterrows():
-                try:
-                    # 1. Parsowanie wiersza
-                    row_data = PortfolioService._parse_csv_row(row)
-                    if not row_data:
-                        continue
-
-                    # 2. Sprawdzenie duplikatów transakcji
-                    if row_data['tx_ref'] and _transaction_exists(portfolio.id, row_data['tx_ref']):
-                        continue
-
-                    # 3. Definicja obligacji
-                    bond_def = _get_or_create_bond_definition(row_data['isin'], row)
-
-                    # 4. Aktualizacja Holdingu (Upsert)
-                    PortfolioService._upsert_holding(portfolio, bond_def, row_data)
-
-                    # 5. Rejestracja Transakcji
-                    PortfolioService._create_transaction_record(portfolio, bond_def, row_data)
-
-                    imported_count += 1
+        if file_hash and db.session.query(ImportedFile.id).filter_by(
+                portfolio_id=portfolio.id, content_hash=file_hash).first():
+            db.session.rollback()
+            return {"imported": 0, "errors": [], "duplicate_file": True}
 
-                except Exception as e:
-                    errors.append(f"Wiersz {index}: {str(e)}")
+        def reject(chunk: pd.DataFrame, failed: pd.Series):
+            nonlocal error_rows
+            error_rows += len(failed)
+            for index, message in failed.head(_MAX_ERROR_MESSAGES - len(errors)).items():
+                errors.append(f"Wiersz {index}: {message}")
+            if error_writer:
+                error_writer.write(chunk.loc[failed.index], failed)
 
-            if errors:
+        try:
+            schema = None
+            fingerprinter = RowFingerprinter()
+            bond_ids = {}
+            created_isins = set()
+            pending = 0
+            for chunk in chunks:
+                # Kolumny źródłowe i formaty dat ustalane raz na plik
+                schema = schema or CsvImportSchema(chunk.columns)
+                rows = schema.normalize(chunk)
+                rows['fingerprint'] = fingerprinter.fingerprints(rows)
+
+                invalid = _invalid_rows(rows)
+                if not invalid.empty:
+                    reject(chunk, invalid)
+                    rows = rows.drop(invalid.index)
+
+                if commit_every:
+                    for start in range(0, len(rows), commit_every):
+                        part = rows.iloc[start:start + commit_every]
+                        imported, failed = PortfolioService._write_rows_isolated(
+                            portfolio, part, bond_ids, created_isins)
+                        imported_count += imported
+                        if not failed.empty:
+                            reject(chunk, failed)
+                        pending += len(part)
+                        if pending >= commit_every:
+                            PortfolioService._commit_import(portfolio.id, created_isins)
+                            imported_committed = imported_count
+                            pending = 0
+                else:
+                    imported_count += PortfolioService._write_rows(portfolio, rows, bond_ids, created_isins)
+
+                rows_done += len(chunk)
+                if progress:
+                    progress(rows_done, error_rows)
+
+            if errors and not commit_every:
+                # Cały import wycofany - nic nie zostało zapisane
                 db.session.rollback()
+                imported_count = 0
             else:
-                db.session.commit()
+                # Plik z błędami nie jest oznaczany jako zaimportowany - po poprawkach
+                # można go wgrać ponownie, a już zapisane wiersze odrzucą odciski.
+                if file_hash and not errors:
+                    db.session.add(ImportedFile(portfolio_id=portfolio.id, content_hash=file_hash,
+                                                row_count=rows_done, imported_rows=imported_count))
+                PortfolioService._commit_import(portfolio.id, created_isins)
+                imported_committed = imported_count
+                # Dni historii obcięte przez import - przeliczone tutaj, nie przy odczycie wykresu
+                if ValuationService.refresh(user_id):
+                    db.session.commit()
 
         except Exception as e:
             db.session.rollback()
+            # Wycofane jest wszystko po ostatnim commicie (bez commit_every - cały import)
+            imported_count = imported_committed
+            aborted = True
             errors.append(f"Błąd ogólny: {str(e)}")
 
-        return {"imported": imported_count, "errors": errors}
+        return {"imported": imported_count, "errors": errors, "error_rows": error_rows, "aborted": aborted}
 
     @staticmethod
-    def _parse_csv_row(row) -> Optional[Dict]:
-        """Ekstrahuje i parsuje dane z pojedynczego wiersza DataFrame."""
-        isin = _extract_val(row, ['Kod_ISIN', 'isin', 'kod_isin'])
-        if not isin:
-            return None
-
-        return {
-            'isin': isin,
-            'tx_ref': _extract_val(row, ['Numer_Transakcji', 'numer_transakcji', 'id_operacji']),
-            'qty': _parse_float(row, ['ilosc', 'Liczba', 'quantity'], default=1.0),
-            'price': _parse_float(row, ['Cena_Zakupu', 'cena', 'price'], default=100.0),
-            'curr_val': _parse_float(row, ['Aktualna_Wartosc', 'Wartosc', 'current_value'], default=0.0),
-            'date': _parse_date(row, ['Data_Zakupu', 'Data', 'date']) or date.today()
-        }
+    def _commit_import(portfolio_id: int, created_isins: Set[str]):
+        PortfolioService.bump_data_version(portfolio_id)
+        db.session.commit()
+        if created_isins:
+            bond_catalog.refresh(created_isins)
+            created_isins.clear()
 
     @staticmethod
-    def _upsert_holding(portfolio: Portfolio, bond_def: BondDefinition, data: Dict):
-        """Aktualizuje lub tworzy pozycję (Holding) w portfelu - teraz uwzględnia partie (lots)."""
-        qty = data['qty']
-        price = data['price']
-        curr_val = data['curr_val']
-        p_date = data['date']
-
-        # Szukamy DOKŁADNEGO dopasowania (ta sama obligacja, ta sama data zakupu, ta sama cena zakupu)
-        # Dzięki temu "dokupienie" w tych samych warunkach powiększy pozycję,
-        # a zakup w innej dacie/cenie stworzy nową (osobny wiersz).
-        holding = Holding.query.filter_by(
-            portfolio_id=portfolio.id,
-            bond_definition_id=bond_def.id,
-            purchase_date=p_date,
-            purchase_price=price
-        ).first()
-
-        if holding:
-            # Dopasowano partię -> Aktualizacja ilości
-            new_total_qty = float(holding.quantity) + float(qty)
-            holding.quantity = new_total_qty
-            
-            # Cena jest ta sama (warunek wyszukiwania), więc nie zmieniamy purchase_price
-
-            # Sumowanie wartości bieżącej
-            current_val_base = float(holding.current_value) if holding.current_value is not None else 0.0
-            holding.current_value = current_val_base + float(curr_val)
-
-            # Reset referencji transakcji przy agregacji
-            holding.transaction_reference = None
-        else:
-            # Nowa pozycja (osobny lot)
-            holding = Holding(
-                portfolio_id=portfolio.id,
-                bond_definition_id=bond_def.id,
-                quantity=qty,
-                purchase_price=price,
-                purchase_date=p_date,
-                current_value=curr_val,
-                transaction_reference=None
+    def _write_rows_isolated(portfolio: Portfolio, rows: pd.DataFrame, bond_ids: Dict[str, int],
+                             created_isins: Set[str]) -> Tuple[int, pd.Series]:
+        """
+        Zapisuje wiersze w savepoincie. Gdy zapis partii się nie uda, partia jest
+        wycofywana i zapisywana ponownie wiersz po wierszu, żeby odizolować błędne wiersze.
+        Zwraca (liczba zapisanych wierszy, komunikaty błędów indeksowane numerem wiersza).
+        """
+        known_isins = set(bond_ids)
+        savepoint = db.session.begin_nested()
+        try:
+            imported = PortfolioService._write_rows(portfolio, rows, bond_ids, created_isins)
+            savepoint.commit()
+            return imported, pd.Series(dtype=object)
+        except SQLAlchemyError as e:
+            savepoint.rollback()
+            # Definicje utworzone w wycofanym savepoincie już nie istnieją
+            for isin in set(bond_ids) - known_isins:
+                del bond_ids[isin]
+                created_isins.discard(isin)
+            if len(rows) == 1:
+                return 0, pd.Series({rows.index[0]: str(getattr(e, 'orig', None) or e)[:200]}, dtype=object)
+
+        imported = 0
+        failed = []
+        for i in range(len(rows)):
+            row_imported, row_failed = PortfolioService._write_rows_isolated(
+                portfolio, rows.iloc[i:i + 1], bond_ids, created_isins)
+            imported += row_imported
+            failed.append(row_failed)
+        return imported, pd.concat(failed)
+
+    @staticmethod
+    def _write_rows(portfolio: Portfolio, rows: pd.DataFrame, bond_ids: Dict[str, int],
+                    created_isins: Set[str]) -> int:
+        """Zapisuje znormalizowane wiersze. Zwraca liczbę zaimportowanych (nie-duplikatów)."""
+        # 1. Odrzucenie duplikatów - po odcisku wiersza i po referencji transakcji,
+        # jedno zapytanie na porcję dla każdego z nich.
+        # Wcześniejsze porcje są już zapisane w tej samej transakcji, więc też zostaną wykryte.
+        known_fingerprints = _existing_fingerprints(portfolio.id, rows['fingerprint'].tolist())
+        has_ref = rows['tx_ref'].notna()
+        known_refs = _existing_transaction_refs(portfolio.id, set(rows.loc[has_ref, 'tx_ref']))
+        duplicate = rows['fingerprint'].isin(known_fingerprints) | (
+            has_ref & (rows['tx_ref'].isin(known_refs) | rows['tx_ref'].duplicated()))
+        rows = rows[~duplicate]
+        if rows.empty:
+            return 0
+
+        # 2. Definicje obligacji dla wszystkich nowych ISIN naraz
+        new_defs = rows[~rows['isin'].isin(bond_ids.keys())].drop_duplicates('isin')
+        if not new_defs.empty:
+            bond_ids.update(_resolve_bond_definitions(new_defs, created_isins))
+        rows = rows.assign(bond_definition_id=rows['isin'].map(bond_ids))
+
+        # 3. Scalenie partii w pamięci i zapis masowy (+ przyrostowa aktualizacja agregatów statystyk)
+        deltas = PortfolioService._bulk_upsert_holdings(portfolio, rows)
+        PortfolioService._bulk_create_transactions(portfolio, rows)
+        AggregateService.apply_deltas(portfolio.id, deltas)
+        # Historia wyceny od najwcześniejszego zakupu w porcji jest nieaktualna (dopisze ją refresh)
+        ValuationService.truncate_history(portfolio.id, since=rows['date'].min())
+        return len(rows)
+
+    @staticmethod
+    def _bulk_upsert_holdings(portfolio: Portfolio, rows: pd.DataFrame) -> List[Tuple[int, float, float, int]]:
+        """
+        Aktualizuje lub tworzy pozycje (Holdings) - jedna partia (lot) to ta sama obligacja,
+        ta sama data zakupu i ta sama cena zakupu. Dzięki temu "dokupienie" w tych samych
+        warunkach powiększy pozycję, a zakup w innej dacie/cenie stworzy nową (osobny wiersz).
+        Zwraca zmiany dla agregatów: (bond_definition_id, wartość, koszt, nowe pozycje).
+        """
+        # Scalenie wierszy pliku w partie (cena w bazie to DECIMAL(10, 4) - porównujemy z tą precyzją)
+        lots = (rows.assign(price_key=rows['price'].round(4))
+                .groupby(['bond_definition_id', 'date', 'price_key'], sort=False)
+                .agg(qty=('qty', 'sum'), curr_val=('curr_val', 'sum'), price=('price', 'first')))
+
+        # Istniejące partie dla importowanych obligacji - zapytania IN zamiast jednego na wiersz
+        existing = {}
+        bond_def_ids = sorted(int(i) for i in lots.index.get_level_values('bond_definition_id').unique())
+        for chunk in chunked(bond_def_ids):
+            result = db.session.execute(
+                select(Holding.id, Holding.bond_definition_id, Holding.purchase_date,
+                       Holding.purchase_price, Holding.quantity, Holding.current_value)
+                .where(Holding.portfolio_id == portfolio.id, Holding.bond_definition_id.in_(chunk))
             )
-            db.session.add(holding)
+            for h_id, bd_id, p_date, p_price, qty, curr_val in result:
+                existing.setdefault((bd_id, p_date, round(float(p_price), 4)), (h_id, qty, curr_val, p_price))
+
+        updates = []
+        inserts = []
+        deltas = []
+        for (bd_id, p_date, price_key), qty, curr_val, price in zip(
+                lots.index, lots['qty'].tolist(), lots['curr_val'].tolist(), lots['price'].tolist()):
+            match = existing.get((bd_id, p_date, price_key))
+            if match:
+                # Dopasowano partię -> Aktualizacja ilości i sumowanie wartości bieżącej
+                h_id, h_qty, h_curr_val, h_price = match
+                deltas.append((int(bd_id), curr_val, qty * float(h_price), 0))
+                updates.append({
+                    'id': h_id,
+                    'quantity': float(h_qty) + qty,
+                    'current_value': (float(h_curr_val) if h_curr_val is not None else 0.0) + curr_val,
+                    # Reset referencji transakcji przy agregacji
+                    'transaction_reference': None,
+                })
+            else:
+                # Nowa pozycja (osobny lot)
+                deltas.append((int(bd_id), curr_val, qty * price, 1))
+                inserts.append({
+                    'portfolio_id': portfolio.id,
+                    'bond_definition_id': int(bd_id),
+                    'quantity': qty,
+                    'purchase_price': price,
+                    'purchase_date': p_date,
+                    'current_value': curr_val,
+                    'transaction_reference': None,
+                })
+
+        if updates:
+            db.session.execute(update(Holding), updates)
+        if inserts:
+            db.session.execute(insert(Holding), inserts)
+        return deltas
 
     @staticmethod
-    def _create_transaction_record(portfolio: Portfolio, bond_def: BondDefinition, data: Dict):
-        """Tworzy rekord w historii transakcji."""
-        new_tx = Transaction(
-            portfolio_id=portfolio.id,
-            bond_definition_id=bond_def.id,
-            transaction_type='BUY',
-            quantity=data['qty'],
-            price=data['price'],
-            transaction_date=data['date'],
-            transaction_reference=data['tx_ref']
-        )
-        db.session.add(new_tx)
+    def _bulk_create_transactions(portfolio: Portfolio, rows: pd.DataFrame):
+        """Tworzy rekordy w historii transakcji jednym masowym INSERT."""
+        records = frame_records(rows, ['bond_definition_id', 'qty', 'price', 'date', 'tx_ref', 'fingerprint'])
+        db.session.execute(insert(Transaction), [
+            {
+                'portfolio_id': portfolio.id,
+                'bond_definition_id': r['bond_definition_id'],
+                'transaction_type': 'BUY',
+                'quantity': r['qty'],
+                'price': r['price'],
+                'transaction_date': r['date'],
+                'transaction_reference': r['tx_ref'],
+                'row_fingerprint': r['fingerprint'],
+            }
+            for r in records
+        ])
 
 
 # --- Helpers (funkcje pomocnicze) ---
 
-def _extract_val(row, keys):
-    for k in keys:
-        if k in row and pd.notna(row[k]) and str(row[k]).strip() != '':
-            return str(row[k]).strip()
-    return None
-
-
-def _parse_float(row, keys, default=0.0):
-    val = _extract_val(row, keys)
-    if not val: return default
-    try:
-        # Obsługa polskiego formatu liczb
-        clean = str(val).replace(' ', '').replace(',', '.').replace('zł', '').replace('%', '')
-        return float(clean)
-    except:
-        return default
-
-
-def _parse_date(row, keys):
-    val = _extract_val(row, keys)
-    if not val: return None
-    try:
-        return pd.to_datetime(val, dayfirst=True).date()
-    except:
-        return None
-
-
-def _transaction_exists(pid, ref):
-    if not ref: return False
-    # Sprawdzamy w tabeli Transactions
-    return db.session.query(Transaction).filter_by(
-        portfolio_id=pid,
-        transaction_reference=ref
-    ).first() is not None
-
-
-def _get_or_create_bond_definition(isin, row):
-    bond = BondDefinition.query.filter_by(isin=isin).first()
-    if not bond:
-        # Próba wyciągnięcia danych z różnych kolumn
-        name = _extract_val(row, ['Nazwa', 'Papier', 'name']) or isin
-        series = _extract_val(row, ['Seria_Obligacji', 'Seria', 'series']) or isin
-        b_type = _extract_val(row, ['Typ_Obligacji', 'Typ', 'type'])
-
-        # Parsowanie dat
-        mat_date = _parse_date(row, ['Data_Wykupu', 'Maturity'])
-        em_date = _parse_date(row, ['Data_Emisji', 'Emission'])
-
-        # Oprocentowanie
-        coupon = _parse_float(row, ['Oprocentowanie', 'Coupon']) / 100.0 if _extract_val(row, ['Oprocentowanie',
-                                                                                               'Coupon']) else None
-
-        bond = BondDefinition(
-            isin=isin,
-            name=name,
-            issuer='Skarb Państwa',  # Domyślnie
-            series=series,
-            bond_type=b_type,
-            maturity_date=mat_date,
-            emission_date=em_date,
-            coupon_rate=coupon
-        )
-        db.session.add(bond)
-        db.session.flush()  # Żeby dostać ID
-    else:
-        # Opcjonalnie: Uzupełnianie brakujących danych w definicji
-        pass
-    return bond
\ No newline at end of file
+def _existing_transaction_refs(pid, refs) -> Set[str]:
+    """Zwraca referencje (spośród podanych), które już istnieją w tabeli Transactions."""
+    found = set()
+    for chunk in chunked(sorted(refs)):
+        found.update(db.session.scalars(
+            select(Transaction.transaction_reference)
+            .where(Transaction.portfolio_id == pid, Transaction.transaction_reference.in_(chunk))
+        ))
+    return found
+
+
+def _decimal_limit(column) -> float:
+    """Największa wartość bezwzględna mieszcząca się w kolumnie DECIMAL(precision, scale)."""
+    return 10.0 ** (column.type.precision - column.type.scale)
+
+
+def _invalid_rows(rows: pd.DataFrame) -> pd.Series:
+    """
+    Walidacja znormalizowanych wierszy względem ograniczeń kolumn w bazie.
+    Zwraca komunikaty błędów dla wierszy, których nie da się zapisać (indeks jak w pliku).
+    """
+    checks = [
+        (rows['isin'].str.len() > BondDefinition.isin.type.length, "Nieprawidłowy kod ISIN"),
+        (rows['tx_ref'].str.len() > Transaction.transaction_reference.type.length, "Zbyt długi numer transakcji"),
+        (rows['qty'].abs() >= _decimal_limit(Transaction.quantity), "Ilość poza zakresem"),
+        (rows['price'].abs() >= _decimal_limit(Transaction.price), "Cena poza zakresem"),
+        (rows['curr_val'].abs() >= _decimal_limit(Holding.current_value), "Wartość poza zakresem"),
+    ]
+    messages = pd.Series(None, index=rows.index, dtype=object)
+    for mask, message in reversed(checks):
+        messages = messages.mask(mask.fillna(False).astype(bool), message)
+    return messages.dropna()
+
+
+def _existing_fingerprints(pid, fingerprints) -> Set[int]:
+    """Zwraca odciski wierszy (spośród podanych), które już istnieją w tabeli Transactions."""
+    found = set()
+    for chunk in chunked(sorted(set(fingerprints))):
+        found.update(db.session.scalars(
+            select(Transaction.row_fingerprint)
+            .where(Transaction.portfolio_id == pid, Transaction.row_fingerprint.in_(chunk))
+        ))
+    return found
+
+
+def _resolve_bond_definitions(new_defs: pd.DataFrame, created: Set[str]) -> Dict[str, int]:
+    """
+    Zwraca mapę ISIN -> id definicji obligacji (z katalogu w pamięci). Brakujące
+    definicje są tworzone jednym masowym INSERT na podstawie pierwszego wiersza z danym
+    ISIN, a ich kody trafiają do `created` - katalog odświeżamy dopiero po commicie.
+    """
+    bond_ids = bond_catalog.get_ids(new_defs['isin'])
+
+    missing = new_defs[~new_defs['isin'].isin(bond_ids.keys())]
+    if not missing.empty:
+        missing = missing.assign(issuer='Skarb Państwa')  # Domyślnie
+        # Rynek liczony raz, przy tworzeniu definicji (wektorowo dla całej porcji)
+        missing['market_category'] = classify_markets(missing['issuer'], missing['series'])
+        records = frame_records(missing, ['isin', 'name', 'issuer', 'series', 'bond_type',
+                                          'maturity_date', 'emission_date', 'coupon', 'market_category'])
+        db.session.execute(insert(BondDefinition), [
+            {
+                'isin': r['isin'],
+                'name': r['name'],
+                'issuer': r['issuer'],
+                'series': r['series'],
+                'bond_type': r['bond_type'],
+                'maturity_date': r['maturity_date'],
+                'emission_date': r['emission_date'],
+                'coupon_rate': r['coupon'],
+                'market_category': r['market_category'],
+            }
+            for r in records
+        ])
+        for chunk in chunked(sorted(missing['isin'])):
+            bond_ids.update(db.session.execute(
+                select(BondDefinition.isin, BondDefinition.id).where(BondDefinition.isin.in_(chunk))
+            ).all())
+        created.update(missing['isin'])
+    return bond_ids
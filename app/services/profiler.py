@@ -0,0 +1,131 @@
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from flask import current_app, g, request
+from flask_login import current_user
+
+logger = logging.getLogger(__name__)
+
+
+class StackSampler:
+    """
+    Próbkujący profiler jednego wątku oparty wyłącznie o bibliotekę standardową.
+
+    Osobny wątek co `interval` sekund odczytuje stos profilowanego wątku
+    (sys._current_frames) i zlicza identyczne stosy - wynik to "collapsed stacks"
+    (ramka;ramka;ramka liczba), format flamegraph.pl / speedscope.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+
+
+class RequestProfiler:
+    """
+    Opcjonalne profilowanie wybranych żądań (per endpoint) próbkującym StackSamplerem.
+
+    Żądanie jest profilowane, gdy:
+      * PROFILER_ENABLED i endpoint jest w PROFILER_ENDPOINTS (puste = wszystkie),
+        z prawdopodobieństwem PROFILER_SAMPLE_RATE, albo
+      * żądanie ma nagłówek X-Profile: 1, a zalogowany użytkownik jest w PROFILER_ADMIN_EMAILS.
+    Stosy są dopisywane do PROFILER_OUTPUT_DIR/<endpoint>.collapsed.
+    Gdy profilowanie jest wyłączone (brak obu ustawień), hooki nie są w ogóle rejestrowane.
+    """
+
+    HEADER = 'X-Profile'
+
+    def __init__(self):
+        self._write_lock = threading.Lock()
+
+    def init_app(self, app):
+        app.extensions['profiler'] = self
+        if not app.config['PROFILER_ENABLED'] and not app.config['PROFILER_ADMIN_EMAILS']:
+            return
+
+        output_dir = app.config['PROFILER_OUTPUT_DIR'] or os.path.join(app.instance_path, 'profiles')
+        endpoints = set(app.config['PROFILER_ENDPOINTS'])
+        admins = {e.lower() for e in app.config['PROFILER_ADMIN_EMAILS']}
+
+        def wanted() -> bool:
+            if request.endpoint is None or request.endpoint == 'static':
+                return False
+            if request.headers.get(self.HEADER) == '1' and admins:
+                return is_admin()
+            return (app.config['PROFILER_ENABLED']
+                    and (not endpoints or request.endpoint in endpoints)
+                    and random.random() < app.config['PROFILER_SAMPLE_RATE'])
+
+        @app.before_request
+        def start_profiler():
+            if wanted():
+                g.profiler = StackSampler(threading.get_ident(), app.config['PROFILER_INTERVAL']).start()
+                g.profiler_started = time.perf_counter()
+
+        @app.after_request
+        def mark_profiled(response):
+            if g.get('profiler') is not None:
+                response.headers['X-Profile-File'] = _file_name(request.endpoint)
+            return response
+
+        @app.teardown_request
+        def stop_profiler(exc=None):
+            sampler = g.pop('profiler', None)
+            if sampler is None:
+                return
+            stacks = sampler.stop()
+            elapsed = time.perf_counter() - g.pop('profiler_started')
+            self._write(output_dir, request.endpoint, stacks)
+            logger.info("Profil %s: %.0f ms, %d próbek", request.endpoint, elapsed * 1000, sum(stacks.values()))
+
+    def _write(self, output_dir: str, endpoint: Optional[str], stacks: Counter):
+        if not stacks:
+            return
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, _file_name(endpoint))
+        with self._write_lock, open(path, 'a', encoding='utf-8') as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in stacks.items())
+
+
+def is_admin() -> bool:
+    """Zalogowany użytkownik jest na liście PROFILER_ADMIN_EMAILS (narzędzia diagnostyczne)."""
+    admins = {e.lower() for e in current_app.config['PROFILER_ADMIN_EMAILS']}
+    return current_user.is_authenticated and current_user.email.lower() in admins
+
+
+def _file_name(endpoint: Optional[str]) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', endpoint or 'unknown') + '.collapsed'
+
+
+profiler = RequestProfiler()
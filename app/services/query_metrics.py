@@ -0,0 +1,83 @@
+import logging
+import time
+from typing import Optional
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Endpoint wykonał więcej zapytań SQL niż pozwala QUERY_BUDGETS (tryb QUERY_BUDGET_ENFORCE)."""
+
+
+class QueryMetrics:
+    """
+    Liczba zapytań SQL i czas spędzony w bazie per żądanie HTTP.
+
+    Zdarzenia silnika SQLAlchemy (before/after_cursor_execute) zliczają instrukcje
+    wykonane w kontekście żądania. Wynik trafia do logu i - gdy QUERY_METRICS_HEADERS -
+    do nagłówków X-DB-Queries / X-DB-Time (ms). QUERY_BUDGETS (endpoint -> limit)
+    wyłapuje wzorce N+1: przekroczenie jest logowane, a z QUERY_BUDGET_ENFORCE
+    kończy się wyjątkiem QueryBudgetExceeded (do testów / CI).
+
+    Zapytania wykonane już po zwróceniu odpowiedzi (np. eksport strumieniowy) nie są wliczane.
+    """
+
+    def __init__(self):
+        self._listening = False
+
+    def init_app(self, app):
+        app.extensions['query_metrics'] = self
+        if not app.config['QUERY_METRICS_ENABLED']:
+            return
+
+        if not self._listening:
+            # Nasłuch na klasie Engine - obejmuje silnik tworzony leniwie przez Flask-SQLAlchemy
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            self._listening = True
+
+        @app.before_request
+        def start_query_metrics():
+            g.db_queries = 0
+            g.db_time = 0.0
+
+        @app.after_request
+        def report_query_metrics(response):
+            queries = g.get('db_queries')
+            if queries is None:
+                return response
+            db_ms = g.db_time * 1000
+
+            logger.info("%s %s -> %d zapytań SQL, %.1f ms w bazie", request.method, request.path, queries, db_ms)
+            if app.config['QUERY_METRICS_HEADERS']:
+                response.headers['X-DB-Queries'] = str(queries)
+                response.headers['X-DB-Time'] = f"{db_ms:.1f}"
+
+            budget = self.budget_for(app, request.endpoint)
+            if budget is not None and queries > budget:
+                message = f"{request.endpoint}: {queries} zapytań SQL (budżet {budget})"
+                if app.config['QUERY_BUDGET_ENFORCE']:
+                    raise QueryBudgetExceeded(message)
+                logger.warning("Przekroczony budżet zapytań - %s", message)
+            return response
+
+    @staticmethod
+    def budget_for(app, endpoint: Optional[str]) -> Optional[int]:
+        return app.config['QUERY_BUDGETS'].get(endpoint, app.config['QUERY_BUDGET_DEFAULT'])
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_start'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'db_queries' in g:
+        g.db_queries += 1
+        g.db_time += time.perf_counter() - conn.info.pop('query_start', time.perf_counter())
+
+
+query_metrics = QueryMetrics()
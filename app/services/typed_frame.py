@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Sequence
+from ..lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+
+# Typy kolumn rozumiane przez typed_frame
+FLOAT = 'float64'
+INT = 'int64'
+DATE = 'datetime64[ns]'
+CATEGORY = 'category'
+TEXT = 'object'
+
+
+def typed_frame(rows: Iterable[Sequence], columns: List[str], schema: Dict[str, str]) -> pd.DataFrame:
+    """
+    Buduje DataFrame o zadeklarowanych typach wprost z krotek wyniku zapytania.
+
+    Każda kolumna jest zamieniana na tablicę NumPy jednym wywołaniem (Decimal -> float64,
+    date -> datetime64, None -> NaN/NaT), bez pośredniej ramki z kolumnami typu object.
+    Dzięki temu kod dalej (wykresy, statystyki) nie musi ponownie konwertować typów.
+    Kolumny spoza schematu zostają jako object.
+    """
+    rows = list(rows)
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    return pd.DataFrame(
+        {name: _column(column, schema.get(name, TEXT)) for name, column in zip(columns, values)},
+        columns=columns,
+    )
+
+
+def _column(values: Sequence, dtype: str):
+    if dtype == FLOAT:
+        return np.array(values, dtype='float64')
+    if dtype == INT:
+        return np.array(values, dtype='int64')
+    if dtype == DATE:
+        # date / None -> datetime64[D] / NaT; DATETIME z bazy też jest obcinany do dnia
+        return np.array(values, dtype='datetime64[D]').astype(DATE)
+    if dtype == CATEGORY:
+        return pd.Categorical(values)
+    return np.array(values, dtype=object)
@@ -0,0 +1,55 @@
+from typing import Dict, Optional
+
+from .cache import LRUCache
+from .. import db
+from ..models.user import User
+
+
+class UserIdentityCache:
+    """
+    Krótkotrwały (TTL) cache tożsamości dla login_manager.user_loader.
+
+    Zamiast zapytania o User + UserSettings przy każdym żądaniu (także każdym
+    wywołaniu AJAX /portfolio/chart-data) trzymany jest odłączony od sesji obiekt
+    User z załadowanymi ustawieniami. Obiekt służy tylko do odczytu - zmiany
+    ustawień zapisuje się na UserSettings pobranym zapytaniem, a potem woła invalidate().
+    Przy kilku procesach (workerach) nieaktualność ogranicza USER_CACHE_TTL.
+    USER_CACHE_TTL = 0 wyłącza cache (użytkownik ładowany z bazy jak dawniej).
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 30):
+        self._cache = LRUCache(max_size, ttl=ttl)
+
+    def init_app(self, app):
+        self._cache = LRUCache(app.config['USER_CACHE_MAX_ENTRIES'], ttl=app.config['USER_CACHE_TTL'])
+        app.extensions['user_cache'] = self
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._cache.ttl)
+
+    def get(self, user_id: int) -> Optional[User]:
+        if not self.enabled:
+            return db.session.get(User, user_id)
+
+        user = self._cache.get(user_id)
+        if user is None:
+            # settings ładują się od razu (lazy='joined'); expunge kaskadowo odłącza też je
+            user = db.session.get(User, user_id)
+            if user is None:
+                return None
+            db.session.expunge(user)
+            self._cache.put(user_id, user)
+        return user
+
+    def invalidate(self, user_id: int):
+        self._cache.pop(user_id)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict:
+        return self._cache.stats()
+
+
+user_cache = UserIdentityCache()
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.bond_definition import BondDefinition
+from app.models.holding import Holding
+from app.models.portfolio import Portfolio
+from app.models.portfolio_history import PortfolioHistory
+from .batching import chunked
+from .typed_frame import typed_frame, FLOAT, INT, DATE
+from .. import db
+from ..lazy import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+DAYS_IN_YEAR = 365
+DEFAULT_NOMINAL = 100.0
+
+# Maksymalna liczba wierszy w jednym upsercie
+_UPSERT_BATCH_SIZE = 5000
+
+# Partie (lots) potrzebne do wyceny
+LOT_COLUMNS = ['purchase_date', 'maturity_date', 'quantity', 'purchase_price', 'coupon_rate', 'nominal_value']
+LOT_DTYPES = {
+    'purchase_date': DATE, 'maturity_date': DATE, 'quantity': FLOAT,
+    'purchase_price': FLOAT, 'coupon_rate': FLOAT, 'nominal_value': FLOAT,
+}
+
+# Kolumny dziennej historii (jak w PortfolioHistory)
+HISTORY_COLUMNS = ['date', 'total_value', 'cash_value', 'bond_value', 'invested_value']
+
+
+class ValuationService:
+    """
+    Dzienna wycena portfela zapisywana w tabeli portfolio_history.
+
+    Wartość partii w dniu d (purchase_date <= d < maturity_date):
+        ilość * (cena zakupu + nominał * oprocentowanie * dni od zakupu / 365),
+    czyli cena zakupu plus liniowo naliczony kupon (wycena uproszczona, bez kapitalizacji).
+    W dniu wykupu wartość partii przechodzi do gotówki (cash_value). Portfolio.cash_balance
+    nie trafia do zapisanej historii (historia sald nie jest przechowywana) - bieżące saldo
+    jest doliczane do total_value przy odczycie, więc zmiana salda nie wymaga przeliczeń.
+
+    Kolejne przebiegi dopisują tylko dni po ostatnim zapisanym. Zmiana pozycji (import,
+    usunięcie) obcina historię od najwcześniejszej daty zakupu zmienionych partii -
+    wcześniejsze dni nie zależą od tych partii, więc zostają.
+    """
+
+    @staticmethod
+    def refresh(user_id: Optional[int] = None, until: Optional[date] = None) -> int:
+        """
+        Dopisuje brakujące dni (do `until`, domyślnie dziś) dla portfeli użytkownika
+        albo - bez user_id - wszystkich portfeli. Bez commita; zwraca liczbę zapisanych dni.
+        """
+        until = until or date.today()
+        return snapshot_portfolios(db.session, stale_portfolios(db.session, until, user_id=user_id), until)
+
+    @staticmethod
+    def truncate_history(portfolio_id: int, since: Optional[date] = None):
+        """Usuwa historię od dnia `since` (bez - całą); brakujące dni dopisze następny refresh()."""
+        query = delete(PortfolioHistory).where(PortfolioHistory.portfolio_id == portfolio_id)
+        if since is not None:
+            query = query.where(PortfolioHistory.date >= since)
+        db.session.execute(query.execution_options(synchronize_session=False))
+
+    @staticmethod
+    def get_user_history(user_id: int) -> pd.DataFrame:
+        """
+        Dzienna historia wszystkich portfeli użytkownika (zsumowana po dniach), prosto z portfolio_history,
+        z doliczonym bieżącym saldem gotówki portfela (Portfolio.cash_balance). Tylko odczyt - brakujące
+        dni dopisują `flask history snapshot` oraz import i usuwanie pozycji (refresh w ich transakcji).
+        """
+        result = db.session.execute(
+            select(PortfolioHistory.date,
+                   func.sum(PortfolioHistory.total_value + Portfolio.cash_balance),
+                   func.sum(PortfolioHistory.invested_value))
+            .join(Portfolio, Portfolio.id == PortfolioHistory.portfolio_id)
+            .where(Portfolio.user_id == user_id)
+            .group_by(PortfolioHistory.date)
+            .order_by(PortfolioHistory.date)
+        )
+        return typed_frame(result, ['date', 'total_value', 'invested_value'],
+                           {'date': DATE, 'total_value': FLOAT, 'invested_value': FLOAT})
+
+
+def stale_portfolios(session: Session, until: date, user_id: Optional[int] = None,
+                     portfolio_ids: Optional[Sequence[int]] = None) -> List[Tuple[int, Optional[date]]]:
+    """Portfele bez historii do dnia `until`: (id, ostatni zapisany dzień lub None), wg id."""
+    last = func.max(PortfolioHistory.date)
+    query = select(Portfolio.id, last) \
+        .outerjoin(PortfolioHistory, PortfolioHistory.portfolio_id == Portfolio.id) \
+        .group_by(Portfolio.id) \
+        .having(or_(last.is_(None), last < until)) \
+        .order_by(Portfolio.id)
+    if user_id is not None:
+        query = query.where(Portfolio.user_id == user_id)
+    if portfolio_ids is not None:
+        query = query.where(Portfolio.id.in_(portfolio_ids))
+    return [(pid, day) for pid, day in session.execute(query)]
+
+
+def snapshot_portfolios(session: Session, portfolios: Sequence[Tuple[int, Optional[date]]],
+                        until: date) -> int:
+    """
+    Wycenia i zapisuje dni od ostatniego zapisanego + 1 do `until` dla grupy portfeli
+    (krotki jak ze stale_portfolios). Partie całej grupy są czytane jednym zapytaniem,
+    zapis to upsert porcjami. Bez commita; zwraca liczbę zapisanych dni.
+    """
+    if not portfolios:
+        return 0
+    lots = load_lots(session, [pid for pid, _ in portfolios])
+    by_portfolio = dict(tuple(lots.groupby('portfolio_id', sort=False)))
+
+    written = 0
+    records = []
+    for portfolio_id, last in portfolios:
+        group = by_portfolio.get(portfolio_id)
+        if group is None:
+            continue
+        records.extend(history_records(portfolio_id, group, last, until))
+        if len(records) >= _UPSERT_BATCH_SIZE:
+            written += upsert_history(session, records)
+            records = []
+    return written + upsert_history(session, records)
+
+
+def load_lots(session: Session, portfolio_ids: Sequence[int]) -> pd.DataFrame:
+    """Partie portfeli z parametrami obligacji (typowana ramka: portfolio_id + LOT_COLUMNS)."""
+    frames = []
+    for chunk in chunked(sorted(portfolio_ids)):
+        result = session.execute(
+            select(Holding.portfolio_id, Holding.purchase_date, BondDefinition.maturity_date, Holding.quantity,
+                   Holding.purchase_price, BondDefinition.coupon_rate, BondDefinition.nominal_value)
+            .join(BondDefinition, BondDefinition.id == Holding.bond_definition_id)
+            .where(Holding.portfolio_id.in_(chunk))
+        )
+        frames.append(typed_frame(result, ['portfolio_id'] + LOT_COLUMNS, dict(LOT_DTYPES, portfolio_id=INT)))
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+def history_records(portfolio_id: int, lots: pd.DataFrame, last: Optional[date], until: date) -> List[Dict]:
+    """Wiersze portfolio_history dla dni od `last` + 1 (bez historii - od pierwszego zakupu) do `until`."""
+    if lots.empty:
+        return []
+    start = last + timedelta(days=1) if last else lots['purchase_date'].min().date()
+    if start > until:
+        return []
+
+    values = daily_values(lots, start, until)
+    columns = [values[name].round(2).tolist() for name in HISTORY_COLUMNS[1:]]
+    return [
+        {'portfolio_id': portfolio_id, 'date': day, 'total_value': total, 'cash_value': cash,
+         'bond_value': bond, 'invested_value': invested}
+        for day, total, cash, bond, invested in zip(values['date'].tolist(), *columns)
+    ]
+
+
+def upsert_history(session: Session, records: List[Dict]) -> int:
+    """
+    Zapis wierszy historii; dzień już zapisany (uq_portfolio_history_date) jest nadpisywany,
+    więc powtórzony lub równoległy przebieg nie kończy się błędem.
+    MySQL: ON DUPLICATE KEY UPDATE, SQLite/PostgreSQL: ON CONFLICT DO UPDATE.
+    """
+    if not records:
+        return 0
+    table = PortfolioHistory.__table__
+    dialect = session.get_bind().dialect.name
+    if dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        new = stmt.inserted
+        stmt = stmt.on_duplicate_key_update({name: new[name] for name in HISTORY_COLUMNS[1:]})
+    else:
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table)
+        new = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['portfolio_id', 'date'],
+            set_={name: new[name] for name in HISTORY_COLUMNS[1:]},
+        )
+    session.execute(stmt, records)
+    return len(records)
+
+
+def daily_values(lots: pd.DataFrame, start: date, end: date) -> Dict[str, np.ndarray]:
+    """
+    Wycena każdego dnia z przedziału [start, end] dla wszystkich partii naraz (tablice NumPy).
+
+    Wartość partii to funkcja liniowa dnia: (koszt - odsetki_dzienne * dzień_zakupu) + odsetki_dzienne * dzień,
+    więc początek i koniec posiadania partii to po dwa wpisy w tablicach różnic (stała i nachylenie),
+    a cumsum daje sumę po partiach dla każdego dnia - koszt O(partie + dni) zamiast O(partie * dni).
+    Tak samo liczone są zainwestowany kapitał (od dnia zakupu) i gotówka z wykupów (od dnia wykupu).
+    """
+    first = np.datetime64(start, 'D').astype('int64')
+    days = np.datetime64(end, 'D').astype('int64') - first + 1
+
+    purchase = _day_numbers(lots['purchase_date'])
+    maturity = _day_numbers(lots['maturity_date'])
+    # Bez daty wykupu - partia trwa poza koniec przedziału; wykup przed zakupem (błędne dane) - zerowy okres
+    matures = ~np.isnat(lots['maturity_date'].to_numpy())
+    maturity = np.where(matures, np.maximum(maturity, purchase), first + days)
+
+    quantity = lots['quantity'].fillna(0).to_numpy()
+    cost = quantity * lots['purchase_price'].fillna(0).to_numpy()
+    nominal = lots['nominal_value'].fillna(DEFAULT_NOMINAL).to_numpy()
+    accrual = quantity * nominal * lots['coupon_rate'].fillna(0).to_numpy() / DAYS_IN_YEAR
+
+    # Indeksy w przedziale; zdarzenia przed startem trafiają na 0, po końcu - na `days` (odrzucane)
+    held_from = np.clip(purchase - first, 0, days)
+    held_to = np.clip(maturity - first, 0, days)
+
+    intercept = _spread(held_from, held_to, cost - accrual * purchase, days)
+    slope = _spread(held_from, held_to, accrual, days)
+    day_numbers = first + np.arange(days)
+    bond_value = intercept + slope * day_numbers
+
+    invested = _spread(held_from, np.full_like(held_from, days), cost, days)
+    payout = np.where(matures, cost + accrual * (maturity - purchase), 0.0)
+    cash_value = _spread(held_to, np.full_like(held_to, days), payout, days)
+
+    return {
+        'date': day_numbers.astype('datetime64[D]').astype(object),
+        'total_value': bond_value + cash_value,
+        'cash_value': cash_value,
+        'bond_value': bond_value,
+        'invested_value': invested,
+    }
+
+
+def _day_numbers(values: pd.Series) -> np.ndarray:
+    return values.to_numpy().astype('datetime64[D]').astype('int64')
+
+
+def _spread(start: np.ndarray, stop: np.ndarray, amount: np.ndarray, days: int) -> np.ndarray:
+    """Suma `amount` dla każdego dnia z [start, stop) - tablica różnic + cumsum."""
+    diff = np.zeros(days + 1)
+    np.add.at(diff, start, amount)
+    np.add.at(diff, stop, -amount)
+    return np.cumsum(diff)[:days]
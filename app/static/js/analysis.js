@@ -94,7 +94,10 @@
             periodSelect.addEventListener('change', (e) => {
                 const map = { 'day': 'D', 'week': 'W', 'month': 'M', 'quarter': 'Q' };
                 const apiFreq = map[e.target.value] || 'D';
-                fetch(`/portfolio/chart-data?freq=${apiFreq}`)
+                // Nie więcej punktów niż pikseli szerokości wykresu (downsampling po stronie serwera)
+                const width = Math.round(tsCanvas.clientWidth);
+                const maxPoints = width ? `&max_points=${width}` : '';
+                fetch(`/portfolio/chart-data?freq=${apiFreq}${maxPoints}`)
                     .then(r => r.json())
                     .then(d => renderValueChart(d))
                     .catch(e => console.error('Chart fetch error:', e));
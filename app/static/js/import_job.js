@@ -0,0 +1,62 @@
+(function () {
+    const box = document.getElementById('import-job');
+    if (!box) return;
+
+    const statusUrl = box.dataset.statusUrl;
+
+    function render(job) {
+        const total = job.rows_total ? ` / ${job.rows_total}` : '';
+        if (job.status === 'done' && job.duplicate_file) {
+            box.className = 'alert alert-warning';
+            box.textContent = 'Ten plik został już wcześniej zaimportowany - pominięto.';
+            return true;
+        }
+        if (job.status === 'done') {
+            box.className = job.error_rows ? 'alert alert-warning' : 'alert alert-success';
+            box.textContent = `Pomyślnie zaimportowano ${job.imported} pozycji.`;
+            if (job.error_rows) {
+                box.textContent += ` Pominięto błędnych wierszy: ${job.error_rows}. `;
+                if (job.errors_url) {
+                    const link = document.createElement('a');
+                    link.href = job.errors_url;
+                    link.className = 'alert-link';
+                    link.textContent = 'Pobierz plik błędów';
+                    box.appendChild(link);
+                }
+                // Zostaw komunikat z linkiem - bez automatycznego odświeżenia
+                return null;
+            }
+            return true;
+        }
+        if (job.status === 'failed') {
+            box.className = 'alert alert-danger';
+            box.textContent = `Błędy podczas importu: ${job.errors.slice(0, 3).join(', ')}`;
+            return true;
+        }
+        const eta = job.eta_seconds !== null ? ` (pozostało ok. ${Math.ceil(job.eta_seconds)} s)` : '';
+        box.textContent = `Import w toku: ${job.rows_done}${total} wierszy${eta}, błędy: ${job.error_count}`;
+        return false;
+    }
+
+    function poll() {
+        fetch(statusUrl, { headers: { 'Accept': 'application/json' } })
+            .then(r => r.json())
+            .then(job => {
+                if (job.error) {
+                    box.className = 'alert alert-warning';
+                    box.textContent = job.error;
+                } else {
+                    const finished = render(job);
+                    if (finished) {
+                        // Import zakończony - odśwież tabelę bez parametru import_job
+                        setTimeout(() => { window.location.href = window.location.pathname; }, 1500);
+                    } else if (finished === false) {
+                        setTimeout(poll, 1000);
+                    }
+                }
+            })
+            .catch(e => console.error('Import status error:', e));
+    }
+
+    poll();
+})();
@@ -0,0 +1,152 @@
+"""
+Benchmark danych widoków /statistics i /portfolio/analiza (sumy, koszt, podział wg typu
+i rynku): dawna ścieżka z ramki portfela (get_user_portfolio_df + build_allocation_pie_data
+wg typu i wg market_category) kontra jedno zapytanie do agregatów
+(AggregateService.get_statistics), którego używają teraz oba widoki.
+
+Ramka jest mierzona na zimno (pusty cache - odczyt pozycji z bazy) i z cache.
+Pamięć to szczyt alokacji w trakcie wywołania (tracemalloc). Oba wyniki są porównywane.
+Wyniki są dopisywane do benchmarks/results/analytics.jsonl.
+
+Użycie:
+    python -m benchmarks.bench_analytics
+    python -m benchmarks.bench_analytics --lots 20000 100000 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+
+import numpy as np
+
+from benchmarks.common import StatementCounter, Timer, create_bench_app, format_delta, save_result
+
+BOND_TYPES = ['EDO', 'COI', 'ROR', 'DOS', 'TOS', 'KOR', 'OBL']
+
+
+def seed(app, lots: int, definitions: int = 500, seed: int = 7):
+    """Jeden portfel z `lots` partiami obligacji skarbowych i korporacyjnych; agregaty przeliczone od zera."""
+    from sqlalchemy import insert
+    from app import db
+    from app.models.bond_definition import BondDefinition
+    from app.models.holding import Holding
+    from app.models.portfolio import Portfolio
+    from app.services.aggregate_service import AggregateService
+    from app.services.bond_markets import classify_markets
+
+    rng = np.random.default_rng(seed)
+    start = date(2018, 1, 1)
+    types = [BOND_TYPES[i % len(BOND_TYPES)] for i in range(definitions)]
+    issuers = ['Skarb Państwa' if t not in ('KOR', 'OBL') else f'Spółka {i}' for i, t in enumerate(types)]
+    series = [f"{t}{i:04d}" for i, t in enumerate(types)]
+    markets = classify_markets(issuers, series)
+    with app.app_context():
+        db.session.execute(insert(BondDefinition), [
+            {'id': i + 1, 'isin': f"PL{i:010d}", 'name': series[i], 'issuer': issuers[i], 'series': series[i],
+             'bond_type': types[i], 'maturity_date': start + timedelta(days=30 * i + 3650),
+             'emission_date': start + timedelta(days=30 * i), 'coupon_rate': 0.068, 'nominal_value': 100,
+             'market_category': markets[i]}
+            for i in range(definitions)
+        ])
+        db.session.execute(insert(Portfolio), [{'id': 1, 'user_id': 1, 'name': 'Portfel', 'cash_balance': 0}])
+        db.session.execute(insert(Holding), [
+            {'portfolio_id': 1, 'bond_definition_id': bd_id, 'quantity': qty, 'purchase_price': price,
+             'purchase_date': start + timedelta(days=days), 'current_value': round(qty * price, 2)}
+            for bd_id, qty, price, days in zip(
+                rng.integers(1, definitions + 1, lots).tolist(), rng.integers(1, 500, lots).tolist(),
+                rng.uniform(95, 105, lots).round(2).tolist(), rng.integers(0, 2500, lots).tolist())
+        ])
+        AggregateService.rebuild(1)
+        db.session.commit()
+
+
+def from_frame(user_id: int) -> dict:
+    from app.services.charts_service import build_allocation_pie_data
+    from app.services.portfolio_service import PortfolioService
+
+    df = PortfolioService.get_user_portfolio_df(user_id)
+    return {
+        'total_value': float(df['current_value'].sum()),
+        'invested_cost': float((df['quantity'] * df['purchase_price']).sum()),
+        'holdings_count': len(df),
+        'pie_data': build_allocation_pie_data(df, group_by_candidates=['bond_type'], value_column='current_value'),
+        'market_data': build_allocation_pie_data(df, group_by_candidates=['market_category'],
+                                                 value_column='current_value'),
+    }
+
+
+def from_aggregates(user_id: int) -> dict:
+    from app.services.aggregate_service import AggregateService
+    return AggregateService.get_statistics(user_id)
+
+
+def measure(func, repeat: int, before=None):
+    """Mediana czasu i największy szczyt alokacji (MB) z `repeat` wywołań; before() przed każdym."""
+    seconds, peaks, result = [], [], None
+    for _ in range(repeat):
+        if before:
+            before()
+        tracemalloc.start()
+        with Timer() as timer:
+            result = func(1)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        seconds.append(timer.seconds)
+    return round(statistics.median(seconds), 4), round(max(peaks) / 2 ** 20, 2), result
+
+
+def _check(expected: dict, actual: dict):
+    for key in ('total_value', 'invested_cost'):
+        if abs(expected[key] - actual[key]) > 0.05:
+            raise RuntimeError(f"{key}: {expected[key]} != {actual[key]}")
+    if expected['holdings_count'] != actual['holdings_count']:
+        raise RuntimeError(f"holdings_count: {expected['holdings_count']} != {actual['holdings_count']}")
+    for key in ('pie_data', 'market_data'):
+        if expected[key]['labels'] != actual[key]['labels'] or not np.allclose(
+                expected[key]['values'], actual[key]['values'], atol=0.05):
+            raise RuntimeError(f"{key}: {expected[key]} != {actual[key]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lots', type=int, nargs='+', default=[100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--no-save', action='store_true', help='nie zapisuj wyników')
+    args = parser.parse_args()
+
+    from app import db
+    from app.services.portfolio_cache import portfolio_cache
+
+    print(f"{'partie':>8} {'ramka zimna [s]':>16} {'ramka cache [s]':>16} {'agregaty [s]':>13} "
+          f"{'ramka [MB]':>11} {'agregaty [MB]':>14} {'zapytania':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for lots in args.lots:
+            app = create_bench_app(os.path.join(workdir, f'analytics-{lots}.db'))
+            seed(app, lots)
+            with app.app_context():
+                cold_seconds, frame_mb, expected = measure(from_frame, args.repeat, before=portfolio_cache.clear)
+                warm_seconds, _, _ = measure(from_frame, args.repeat)
+                with StatementCounter(db.engine) as counter:
+                    seconds, aggregates_mb, actual = measure(from_aggregates, args.repeat)
+            _check(expected, actual)
+
+            result = {
+                'key': f'lots={lots}',
+                'lots': lots,
+                'frame_cold_seconds': cold_seconds,
+                'frame_cached_seconds': warm_seconds,
+                'seconds': seconds,
+                'frame_peak_mb': frame_mb,
+                'peak_mb': aggregates_mb,
+                'statements': counter.count // args.repeat,
+            }
+            previous = None if args.no_save else save_result('analytics', result)
+            delta = format_delta(result['seconds'], previous and previous['seconds'])
+            print(f"{lots:>8} {cold_seconds:>16} {warm_seconds:>16} {seconds:>13} "
+                  f"{frame_mb:>11} {aggregates_mb:>14} {result['statements']:>10}{delta}")
+
+
+if __name__ == '__main__':
+    main()
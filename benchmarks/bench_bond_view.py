@@ -0,0 +1,103 @@
+"""
+Benchmark budowania listy Bond dla widoku /portfolio: dawna ścieżka
+(fillna + iterrows + Bond.from_dataframe_row) kontra Bond.from_dataframe.
+
+Ramka ma kolumny jak PortfolioService.get_user_portfolio_df (z typowymi brakami:
+puste referencje, daty emisji i oprocentowanie). Oba wyniki są porównywane pole po polu.
+Wyniki są dopisywane do benchmarks/results/bond_view.jsonl.
+
+Użycie:
+    python -m benchmarks.bench_bond_view
+    python -m benchmarks.bench_bond_view --sizes 5000 50000
+"""
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import Timer, format_delta, save_result
+
+DEFAULT_SIZES = [50000]
+
+
+def portfolio_frame(rows: int, seed: int = 7) -> pd.DataFrame:
+    """Syntetyczna ramka portfela o rozkładzie zbliżonym do prawdziwych danych."""
+    from app.services.portfolio_service import PORTFOLIO_COLUMNS
+
+    rng = np.random.default_rng(seed)
+    series_count = 200
+    start = date(2018, 1, 1)
+    series = [f"EDO{i:04d}" for i in range(series_count)]
+    emission = [start + timedelta(days=30 * i) for i in range(series_count)]
+    coupons = rng.choice([0.068, 0.07, 0.0725, 0.0575, 0.065, float('nan')], series_count)
+
+    picked = rng.integers(0, series_count, rows)
+    df = pd.DataFrame({
+        'holding_id': np.arange(1, rows + 1),
+        'isin': [f"PL{i:010d}" for i in picked],
+        'name': [series[i] for i in picked],
+        'issuer': 'Skarb Państwa',
+        'series': [series[i] for i in picked],
+        'bond_type': [series[i][:3] for i in picked],
+        'maturity_date': [emission[i] + timedelta(days=3650) for i in picked],
+        'emission_date': [emission[i] if i % 5 else None for i in picked],
+        'coupon_rate': coupons[picked],
+        'nominal_value': np.where(picked % 3, 100.0, np.nan),
+        'quantity': rng.integers(1, 500, rows).astype(float),
+        'purchase_price': rng.uniform(95, 105, rows).round(2),
+        'purchase_date': [start + timedelta(days=int(d)) for d in rng.integers(0, 2500, rows)],
+        'current_value': rng.uniform(100, 50000, rows).round(2),
+        'transaction_reference': None,
+        'market_category': 'Skarbowe',
+    })
+    return df[PORTFOLIO_COLUMNS]
+
+
+def build_legacy(df: pd.DataFrame) -> list:
+    from app.models.bond import Bond
+    df = df.fillna("").replace({"None": ""})
+    return [Bond.from_dataframe_row(row) for _, row in df.iterrows()]
+
+
+def build_vectorized(df: pd.DataFrame) -> list:
+    from app.models.bond import Bond
+    return Bond.from_dataframe(df)
+
+
+def _as_text(bonds: list) -> list:
+    return [tuple(str(getattr(b, f)) for f in b.__slots__) for b in bonds]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--no-save', action='store_true', help='nie zapisuj wyników')
+    args = parser.parse_args()
+
+    print(f"{'pozycje':>10} {'iterrows [s]':>14} {'from_dataframe [s]':>20} {'przyspieszenie':>16}")
+    for rows in args.sizes:
+        df = portfolio_frame(rows)
+        with Timer() as legacy_timer:
+            legacy = build_legacy(df)
+        with Timer() as vector_timer:
+            vectorized = build_vectorized(df)
+
+        if _as_text(legacy) != _as_text(vectorized):
+            raise RuntimeError("Bond.from_dataframe daje inny wynik niż from_dataframe_row")
+
+        result = {
+            'key': f'rows={rows}',
+            'rows': rows,
+            'legacy_seconds': round(legacy_timer.seconds, 3),
+            'seconds': round(vector_timer.seconds, 3),
+            'speedup': round(legacy_timer.seconds / vector_timer.seconds, 1),
+        }
+        previous = None if args.no_save else save_result('bond_view', result)
+        delta = format_delta(result['seconds'], previous and previous['seconds'])
+        print(f"{rows:>10} {result['legacy_seconds']:>14} {result['seconds']:>20} "
+              f"{result['speedup']:>15}x{delta}")
+
+
+if __name__ == '__main__':
+    main()
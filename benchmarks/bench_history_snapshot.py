@@ -0,0 +1,105 @@
+"""
+Benchmark nocnego zapisu historii wyceny (`flask history snapshot`) na lokalnym SQLite.
+
+Tworzy N portfeli po kilka partii, a każdy portfel ma już historię do wczoraj -
+jak w zwykłą noc dopisywany jest jeden dzień. Mierzy run_snapshot dla podanej
+liczby procesów i ekstrapoluje czas dla 100 000 portfeli. Uwaga: SQLite
+serializuje zapisy, więc zysk z wielu procesów widać dopiero na MySQL.
+Wyniki są dopisywane do benchmarks/results/history_snapshot.jsonl.
+
+Użycie:
+    python -m benchmarks.bench_history_snapshot
+    python -m benchmarks.bench_history_snapshot --portfolios 20000 --lots 8 --workers 1 4
+"""
+import argparse
+import os
+import tempfile
+from datetime import date, timedelta
+
+import numpy as np
+
+from benchmarks.common import StatementCounter, Timer, create_bench_app, format_delta, save_result
+
+TARGET_PORTFOLIOS = 100000
+
+
+def seed(app, portfolios: int, lots: int, until: date, seed: int = 7):
+    """Portfele, definicje obligacji, partie i jeden dzień historii (wczoraj) dla każdego portfela."""
+    from sqlalchemy import insert
+    from app import db
+    from app.models.bond_definition import BondDefinition
+    from app.models.holding import Holding
+    from app.models.portfolio import Portfolio
+    from app.models.portfolio_history import PortfolioHistory
+
+    rng = np.random.default_rng(seed)
+    start = date(2018, 1, 1)
+    yesterday = until - timedelta(days=1)
+    with app.app_context():
+        db.session.execute(insert(BondDefinition), [
+            {'id': i, 'isin': f"PL{i:010d}", 'name': f"EDO{i:04d}", 'issuer': 'Skarb Państwa',
+             'series': f"EDO{i:04d}", 'bond_type': 'EDO', 'maturity_date': start + timedelta(days=30 * i + 3650),
+             'emission_date': start + timedelta(days=30 * i), 'coupon_rate': 0.068, 'nominal_value': 100}
+            for i in range(1, 201)
+        ])
+        db.session.execute(insert(Portfolio), [
+            {'id': pid, 'user_id': 1, 'name': f"Portfel {pid}", 'cash_balance': 0} for pid in range(1, portfolios + 1)
+        ])
+        total = portfolios * lots
+        db.session.execute(insert(Holding), [
+            {'portfolio_id': pid, 'bond_definition_id': bd_id, 'quantity': qty, 'purchase_price': price,
+             'purchase_date': start + timedelta(days=days)}
+            for pid, bd_id, qty, price, days in zip(
+                np.repeat(np.arange(1, portfolios + 1), lots).tolist(), rng.integers(1, 201, total).tolist(),
+                rng.integers(1, 500, total).tolist(), rng.uniform(95, 105, total).round(2).tolist(),
+                rng.integers(0, 2500, total).tolist())
+        ])
+        db.session.execute(insert(PortfolioHistory), [
+            {'portfolio_id': pid, 'date': yesterday, 'total_value': 0, 'cash_value': 0, 'bond_value': 0,
+             'invested_value': 0}
+            for pid in range(1, portfolios + 1)
+        ])
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--portfolios', type=int, default=10000)
+    parser.add_argument('--lots', type=int, default=5, help='partie na portfel')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1])
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--no-save', action='store_true', help='nie zapisuj wyników')
+    args = parser.parse_args()
+
+    from app import db
+    from app.services.history_snapshot import run_snapshot
+
+    until = date.today()
+    print(f"{'procesy':>8} {'czas [s]':>10} {'portfele/s':>12} {'zapytania':>10} {'100k [min]':>11}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for workers in args.workers:
+            app = create_bench_app(os.path.join(workdir, f'snapshot-{workers}.db'))
+            seed(app, args.portfolios, args.lots, until)
+            with app.app_context(), StatementCounter(db.engine) as counter, Timer() as timer:
+                portfolios, days = run_snapshot(until, workers=workers, batch_size=args.batch_size)
+            if portfolios != args.portfolios or days != args.portfolios:
+                raise RuntimeError(f"Zapisano {days} dni dla {portfolios} portfeli (oczekiwano {args.portfolios})")
+
+            rate = portfolios / timer.seconds
+            result = {
+                'key': f'portfolios={args.portfolios},lots={args.lots},workers={workers}',
+                'portfolios': portfolios,
+                'seconds': round(timer.seconds, 3),
+                'portfolios_per_second': round(rate),
+                # Zapytania procesu głównego (przy workers > 1 porcje wykonują procesy robocze)
+                'statements': counter.count,
+                'projected_100k_minutes': round(TARGET_PORTFOLIOS / rate / 60, 2),
+            }
+            previous = None if args.no_save else save_result('history_snapshot', result)
+            delta = format_delta(result['seconds'], previous and previous['seconds'])
+            print(f"{workers:>8} {result['seconds']:>10} {result['portfolios_per_second']:>12} "
+                  f"{counter.count:>10} {result['projected_100k_minutes']:>11}{delta}")
+
+
+if __name__ == '__main__':
+    main()
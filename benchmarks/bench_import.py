@@ -0,0 +1,78 @@
+"""
+Benchmark importu CSV: CsvService.iter_csv_chunks + PortfolioService.import_csv_data
+na lokalnym SQLite, dla plików 1k/10k/100k/1M wierszy.
+
+Raportuje wiersze/s, liczbę instrukcji SQL i szczytowe RSS. Każdy rozmiar działa
+w osobnym procesie (niezależny pomiar pamięci). Wyniki są dopisywane do
+benchmarks/results/import.jsonl i porównywane z poprzednim uruchomieniem.
+
+Użycie:
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --sizes 1000 10000 100000 1000000
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+
+from benchmarks.common import (StatementCounter, Timer, create_bench_app, format_delta, peak_rss_mb,
+                               save_result)
+from benchmarks.generate_csv import write_csv
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def run_import(rows: int, workdir: str, chunk_size: int) -> dict:
+    from app import db
+    from app.services.csv_service import CsvService
+    from app.services.portfolio_service import PortfolioService
+
+    csv_path = write_csv(os.path.join(workdir, f'broker-{rows}.csv'), rows)
+    app = create_bench_app(os.path.join(workdir, f'bench-{rows}.db'))
+    rss_before = peak_rss_mb()
+
+    with app.app_context():
+        with open(csv_path, 'rb') as f, StatementCounter(db.engine) as counter, Timer() as timer:
+            chunks = CsvService.iter_csv_chunks(f, chunk_size=chunk_size)
+            result = PortfolioService.import_csv_data(1, chunks)
+
+    if result['errors']:
+        raise RuntimeError(f"Import zakończony błędami: {result['errors'][:3]}")
+
+    return {
+        'key': f'rows={rows},chunk={chunk_size}',
+        'rows': rows,
+        'imported': result['imported'],
+        'seconds': round(timer.seconds, 3),
+        'rows_per_second': round(rows / timer.seconds),
+        'sql_statements': counter.count,
+        'peak_rss_mb': peak_rss_mb(),
+        'rss_before_import_mb': rss_before,
+    }
+
+
+def _worker(args):
+    return run_import(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--no-save', action='store_true', help='nie zapisuj wyników')
+    args = parser.parse_args()
+
+    print(f"{'wiersze':>10} {'czas [s]':>10} {'wiersze/s':>12} {'SQL':>8} {'peak RSS [MB]':>14}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.sizes:
+            with multiprocessing.get_context('spawn').Pool(1) as pool:
+                result = pool.apply(_worker, ((rows, workdir, args.chunk_size),))
+
+            previous = None if args.no_save else save_result('import', result)
+            delta = format_delta(result['rows_per_second'], previous and previous['rows_per_second'])
+            print(f"{rows:>10} {result['seconds']:>10} {result['rows_per_second']:>12} "
+                  f"{result['sql_statements']:>8} {result['peak_rss_mb']:>14}{delta}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark zimnego startu: import aplikacji + create_app() + pierwsze żądanie.
+
+Każdy pomiar to nowy proces Pythona (jak respawn workera), profil ProductionConfig
+na lokalnym SQLite. Raportuje medianę czasów i które ciężkie moduły zostały
+faktycznie załadowane. Kończy się kodem 1, gdy mediana przekroczy budżet
+(do użycia w CI). Wyniki są dopisywane do benchmarks/results/startup.jsonl.
+
+Użycie:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --budget 1.5 --runs 7
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import ROOT_DIR, format_delta, save_result
+
+DEFAULT_BUDGET = 2.0  # sekundy: import + create_app() + pierwsze żądanie
+HEAVY_MODULES = ['pandas', 'numpy', 'yfinance']
+
+
+def measure(db_path: str, path: str, start: float) -> dict:
+    """Pomiar w bieżącym (świeżym) procesie; start = chwila tuż po uruchomieniu interpretera."""
+    from app import create_app
+    from app.config import ProductionConfig
+    imported = time.perf_counter()
+
+    config = type('StartupConfig', (ProductionConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'SECRET_KEY': 'benchmark',
+    })
+    app = create_app(config)
+    created = time.perf_counter()
+
+    response = app.test_client().get(path)
+    finished = time.perf_counter()
+    if response.status_code >= 500:
+        raise RuntimeError(f"Pierwsze żądanie zakończone błędem {response.status_code}")
+
+    return {
+        'import_seconds': imported - start,
+        'create_app_seconds': created - imported,
+        'first_request_seconds': finished - created,
+        'seconds': finished - start,
+        'loaded_modules': [m for m in HEAVY_MODULES
+                           if m in sys.modules and type(sys.modules[m]).__name__ != '_LazyModule'],
+    }
+
+
+def _prepare(db_path: str):
+    """Schemat bazy tworzony w osobnym procesie, żeby nie rozgrzać importów pomiaru."""
+    code = f"from benchmarks.common import create_bench_app; create_bench_app({db_path!r})"
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIR, check=True)
+
+
+def _run_child(db_path: str, path: str) -> dict:
+    # Zegar startuje przed jakimkolwiek importem (także SQLAlchemy z benchmarks.common)
+    code = ("import time; start = time.perf_counter(); import json; "
+            "from benchmarks.bench_startup import measure; "
+            f"print(json.dumps(measure({db_path!r}, {path!r}, start)))")
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIR, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help='limit mediany (s)')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--path', default='/auth/login', help='pierwsze żądanie')
+    parser.add_argument('--no-save', action='store_true', help='nie zapisuj wyników')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'startup.db')
+        _prepare(db_path)
+        runs = [_run_child(db_path, args.path) for _ in range(args.runs)]
+
+    median = {key: round(statistics.median(r[key] for r in runs), 3)
+              for key in ('import_seconds', 'create_app_seconds', 'first_request_seconds', 'seconds')}
+    result = dict(median, key=f'path={args.path}', runs=args.runs, budget=args.budget,
+                  loaded_modules=runs[-1]['loaded_modules'])
+
+    previous = None if args.no_save else save_result('startup', result)
+    print(f"import: {median['import_seconds']}s  create_app: {median['create_app_seconds']}s  "
+          f"pierwsze żądanie: {median['first_request_seconds']}s")
+    print(f"razem (mediana z {args.runs}): {median['seconds']}s / budżet {args.budget}s"
+          f"{format_delta(median['seconds'], previous and previous['seconds'])}")
+    print(f"załadowane ciężkie moduły: {', '.join(result['loaded_modules']) or 'brak'}")
+
+    if median['seconds'] > args.budget:
+        print("PRZEKROCZONY BUDŻET STARTU", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
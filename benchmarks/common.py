@@ -0,0 +1,125 @@
+"""
+Wspólne elementy benchmarków: aplikacja na lokalnym SQLite, licznik zapytań SQL,
+pomiar pamięci (peak RSS) i zapis wyników między commitami.
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import BigInteger, event
+from sqlalchemy.ext.compiler import compiles
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+@compiles(BigInteger, 'sqlite')
+def _sqlite_bigint(type_, compiler, **kw):
+    # SQLite nadaje autoinkrementację tylko kolumnom "INTEGER PRIMARY KEY"
+    return 'INTEGER'
+
+
+def create_bench_app(db_path: str, **overrides):
+    """Aplikacja z bazą SQLite w pliku db_path (tworzona od zera) i jednym użytkownikiem (id=1)."""
+    from app import create_app, db
+    from app.config import Config
+    from app.models.user import User
+
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    settings = {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'SQLALCHEMY_ECHO': False,
+        'SECRET_KEY': 'benchmark',
+        'BOND_CATALOG_WARM_ON_STARTUP': False,
+    }
+    settings.update(overrides)
+    app = create_app(type('BenchConfig', (Config,), settings))
+
+    with app.app_context():
+        db.create_all()
+        user = User(email='bench@example.com')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.commit()
+    return app
+
+
+class StatementCounter:
+    """Zlicza instrukcje SQL wysłane do bazy (executemany liczy się jako jedna)."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+
+
+def peak_rss_mb() -> float:
+    """Szczytowe zużycie pamięci bieżącego procesu (MB)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux zwraca KB, macOS bajty
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_result(benchmark: str, record: Dict) -> Optional[Dict]:
+    """
+    Dopisuje wynik do benchmarks/results/<benchmark>.jsonl (z numerem commita i datą)
+    i zwraca poprzedni wynik dla tego samego klucza ('key'), żeby pokazać regresję.
+    """
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f'{benchmark}.jsonl')
+
+    previous = None
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry.get('key') == record.get('key'):
+                    previous = entry
+
+    record = dict(record, revision=git_revision(), timestamp=datetime.now().isoformat(timespec='seconds'))
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + '\n')
+    return previous
+
+
+def format_delta(current: float, previous: Optional[float]) -> str:
+    if not previous:
+        return ''
+    change = (current - previous) / previous * 100
+    return f' ({change:+.1f}% vs poprzedni)'
@@ -0,0 +1,88 @@
+"""
+Generator syntetycznych plików CSV z biura maklerskiego (obligacje skarbowe).
+
+Użycie:
+    python -m benchmarks.generate_csv 100000 /tmp/broker.csv
+"""
+import argparse
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# Typy detalicznych obligacji skarbowych: (prefiks, okres w latach, oprocentowanie %)
+BOND_TYPES = [
+    ('OTS', 0.25, 3.00), ('ROR', 1, 5.75), ('DOR', 2, 5.90), ('TOS', 3, 6.20),
+    ('COI', 4, 6.30), ('EDO', 10, 6.55), ('ROS', 6, 6.50), ('ROD', 12, 6.80),
+]
+
+# Ile serii (miesięcy emisji) na typ obligacji
+_SERIES_PER_TYPE = 60
+
+COLUMNS = ['Kod_ISIN', 'Seria_Obligacji', 'Typ_Obligacji', 'Data_Zakupu', 'Data_Emisji', 'Data_Wykupu',
+           'Oprocentowanie', 'Cena_Zakupu', 'ilosc', 'Aktualna_Wartosc', 'Numer_Transakcji']
+
+
+def bond_series() -> pd.DataFrame:
+    """Katalog serii: ISIN, seria (np. EDO0434), typ, daty emisji/wykupu, oprocentowanie."""
+    records = []
+    for type_no, (prefix, years, coupon) in enumerate(BOND_TYPES):
+        for i in range(_SERIES_PER_TYPE):
+            emission = date(2019 + i // 12, i % 12 + 1, 1)
+            months = int(years * 12)
+            maturity = date(emission.year + (emission.month - 1 + months) // 12,
+                            (emission.month - 1 + months) % 12 + 1, 1)
+            records.append({
+                'Kod_ISIN': f'PL0000{type_no:02d}{i:04d}',
+                'Seria_Obligacji': f'{prefix}{maturity.month:02d}{maturity.year % 100:02d}',
+                'Typ_Obligacji': prefix,
+                'Data_Emisji': emission,
+                'Data_Wykupu': maturity,
+                'Oprocentowanie': coupon,
+            })
+    return pd.DataFrame(records)
+
+
+def generate_frame(rows: int, seed: int = 42, offset: int = 0) -> pd.DataFrame:
+    """Losowe transakcje zakupu w formacie pliku maklerskiego (polskie liczby i daty)."""
+    rng = np.random.default_rng(seed + offset)
+    series = bond_series()
+    picked = series.iloc[rng.integers(0, len(series), rows)].reset_index(drop=True)
+
+    emission = pd.to_datetime(picked['Data_Emisji'])
+    purchase = emission + pd.to_timedelta(rng.integers(0, 28, rows), unit='D')
+    qty = rng.integers(1, 200, rows)
+    price = np.where(rng.random(rows) < 0.8, 100.0, 99.9)
+    value = qty * 100 * (1 + picked['Oprocentowanie'].to_numpy() / 100 * rng.random(rows))
+
+    return pd.DataFrame({
+        'Kod_ISIN': picked['Kod_ISIN'],
+        'Seria_Obligacji': picked['Seria_Obligacji'],
+        'Typ_Obligacji': picked['Typ_Obligacji'],
+        'Data_Zakupu': purchase.dt.strftime('%d.%m.%Y'),
+        'Data_Emisji': emission.dt.strftime('%d.%m.%Y'),
+        'Data_Wykupu': pd.to_datetime(picked['Data_Wykupu']).dt.strftime('%d.%m.%Y'),
+        'Oprocentowanie': picked['Oprocentowanie'].map(lambda c: f'{c:.2f}%'.replace('.', ',')),
+        'Cena_Zakupu': pd.Series(price).map(lambda p: f'{p:.2f}'.replace('.', ',')),
+        'ilosc': qty,
+        'Aktualna_Wartosc': pd.Series(value).map(lambda v: f'{v:,.2f} zł'.replace(',', ' ').replace('.', ',')),
+        'Numer_Transakcji': [f'ZLC/{offset + i:09d}' for i in range(rows)],
+    }, columns=COLUMNS)
+
+
+def write_csv(path: str, rows: int, seed: int = 42, chunk_size: int = 100000) -> str:
+    """Zapisuje plik CSV porcjami (stała pamięć także dla milionów wierszy)."""
+    for start in range(0, rows, chunk_size):
+        frame = generate_frame(min(chunk_size, rows - start), seed=seed, offset=start)
+        frame.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False, encoding='utf-8')
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('rows', type=int)
+    parser.add_argument('path')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    write_csv(args.path, args.rows, seed=args.seed)
+    print(f'Zapisano {args.rows} wierszy do {args.path}')
@@ -1,22 +1,35 @@
 import pandas as pd
-from app.services.charts_service import build_current_value_timeseries, build_allocation_pie_data
+from datetime import date
+from app.services.charts_service import build_history_pyramid, timeseries_payload, build_allocation_pie_data
+from app.services.valuation_service import daily_values
+
+# Mock partii (lots) - kolumny jak z valuation_service.load_lots
+lots = pd.DataFrame({
+    'purchase_date': pd.to_datetime(['2023-01-01', '2023-06-01', '2023-01-01']),
+    'maturity_date': pd.to_datetime(['2033-01-01', '2024-06-01', '2027-01-01']),
+    'quantity': [10.0, 20.0, 5.0],
+    'purchase_price': [100.0, 100.0, 100.0],
+    'coupon_rate': [0.068, 0.0725, 0.065],
+    'nominal_value': [100.0, 100.0, 100.0],
+})
 
 # Mock DF mimicking what PortfolioService.get_user_portfolio_df returns
-data = {
-    'purchase_date': ['2023-01-01', '2023-06-01', '2023-01-01'],
+df = pd.DataFrame({
     'current_value': [1000.0, 2000.0, 500.0],
-    'quantity': [10, 20, 5],
-    'purchase_price': [100.0, 100.0, 100.0],
-    'bond_type': ['Skarbowe', 'Korporacyjne', 'Skarbowe']
-}
-df = pd.DataFrame(data)
+    'bond_type': ['EDO', 'KOR', 'COI'],
+})
 
-print("\nTesting build_current_value_timeseries...")
-ts = build_current_value_timeseries(df, freq='D')
-print("Keys:", ts.keys())
-print("Labels sample:", ts['labels'][:5])
-print("Values sample:", ts['values'][:5])
-print("Costs sample:", ts['costs'][:5])
+print("\nTesting daily_values + build_history_pyramid...")
+values = daily_values(lots, date(2023, 1, 1), date(2024, 12, 31))
+history = pd.DataFrame({'date': pd.to_datetime(values['date']), 'total_value': values['total_value'],
+                        'invested_value': values['invested_value']})
+pyramid = build_history_pyramid(history)
+for freq in ('D', 'M'):
+    ts = timeseries_payload(pyramid[freq], max_points=100)
+    print(freq, "points:", len(ts['labels']))
+    print("Labels sample:", ts['labels'][:5])
+    print("Values sample:", ts['values'][:5])
+    print("Costs sample:", ts['costs'][:5])
 
 print("\nTesting build_allocation_pie_data...")
 alloc = build_allocation_pie_data(df, group_by_candidates=['bond_type'], value_column='current_value')
@@ -0,0 +1,47 @@
+"""Deduplikacja importu (odciski wierszy i plików)
+
+Revision ID: 3f9c2a7d51b8
+Revises: e806b1001040
+Create Date: 2026-10-18 10:12:41.503117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d51b8'
+down_revision = 'e806b1001040'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('imported_files',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('portfolio_id', sa.BigInteger(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('imported_rows', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('portfolio_id', 'content_hash', name='uq_imported_file_hash')
+    )
+    with op.batch_alter_table('imported_files', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_imported_files_portfolio_id'), ['portfolio_id'], unique=False)
+
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('row_fingerprint', sa.BigInteger(), nullable=True))
+        batch_op.create_index('idx_portfolio_fingerprint', ['portfolio_id', 'row_fingerprint'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('transactions', schema=None) as batch_op:
+        batch_op.drop_index('idx_portfolio_fingerprint')
+        batch_op.drop_column('row_fingerprint')
+
+    with op.batch_alter_table('imported_files', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_imported_files_portfolio_id'))
+
+    op.drop_table('imported_files')
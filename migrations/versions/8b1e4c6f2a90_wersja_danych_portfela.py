@@ -0,0 +1,26 @@
+"""Licznik wersji danych portfela (cache ramek)
+
+Revision ID: 8b1e4c6f2a90
+Revises: 3f9c2a7d51b8
+Create Date: 2026-10-18 12:40:03.118274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b1e4c6f2a90'
+down_revision = '3f9c2a7d51b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('portfolios', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('data_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('portfolios', schema=None) as batch_op:
+        batch_op.drop_column('data_version')
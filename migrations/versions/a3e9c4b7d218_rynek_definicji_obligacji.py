@@ -0,0 +1,44 @@
+"""Kategoria rynku w definicji obligacji
+
+Revision ID: a3e9c4b7d218
+Revises: f1c83a5e0d27
+Create Date: 2026-10-18 18:42:10.113905
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e9c4b7d218'
+down_revision = 'f1c83a5e0d27'
+branch_labels = None
+depends_on = None
+
+# Reguła jak w bond_markets.classify_markets (skopiowana - migracja nie importuje kodu aplikacji)
+TREASURY_ISSUER_KEYWORDS = ('skarb', 'minister')
+TREASURY_SERIES_PREFIXES = ('OTS', 'DOS', 'TOZ', 'COI', 'EDO', 'ROR', 'DOR', 'SP', 'DS', 'WS', 'PS')
+
+
+def upgrade():
+    with op.batch_alter_table('bond_definitions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('market_category', sa.VARCHAR(length=20), server_default='Korporacyjne',
+                                      nullable=False))
+        batch_op.create_index(batch_op.f('ix_bond_definitions_market_category'), ['market_category'], unique=False)
+
+    # Backfill istniejących definicji jednym UPDATE
+    bond_definitions = sa.table('bond_definitions', sa.column('issuer'), sa.column('series'),
+                                sa.column('market_category'))
+    issuer = sa.func.lower(sa.func.coalesce(bond_definitions.c.issuer, ''))
+    series = sa.func.upper(sa.func.coalesce(bond_definitions.c.series, ''))
+    treasury = sa.or_(*[issuer.like(f'%{keyword}%') for keyword in TREASURY_ISSUER_KEYWORDS],
+                      *[series.like(f'{prefix}%') for prefix in TREASURY_SERIES_PREFIXES])
+    op.execute(bond_definitions.update().values(
+        market_category=sa.case((treasury, 'Skarbowe'), else_='Korporacyjne')
+    ))
+
+
+def downgrade():
+    with op.batch_alter_table('bond_definitions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_bond_definitions_market_category'))
+        batch_op.drop_column('market_category')
@@ -0,0 +1,32 @@
+"""Historia wyceny bez salda gotówki portfela
+
+Revision ID: b62f0d9e4c31
+Revises: a3e9c4b7d218
+Create Date: 2026-10-18 21:07:33.480192
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b62f0d9e4c31'
+down_revision = 'a3e9c4b7d218'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Saldo gotówki jest teraz doliczane przy odczycie - historia portfeli z niezerowym
+    # saldem ma je wliczone w każdy dzień, więc jest usuwana (następny odczyt lub
+    # `flask history snapshot` przelicza ją od pierwszego zakupu)
+    portfolios = sa.table('portfolios', sa.column('id'), sa.column('cash_balance'))
+    portfolio_history = sa.table('portfolio_history', sa.column('portfolio_id'))
+    op.execute(portfolio_history.delete().where(portfolio_history.c.portfolio_id.in_(
+        sa.select(portfolios.c.id).where(portfolios.c.cash_balance != 0)
+    )))
+
+
+def downgrade():
+    # Usuniętej historii nie da się odtworzyć - przelicza ją ValuationService.refresh()
+    pass
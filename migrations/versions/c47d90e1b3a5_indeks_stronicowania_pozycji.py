@@ -0,0 +1,26 @@
+"""Indeks do stronicowania pozycji portfela
+
+Revision ID: c47d90e1b3a5
+Revises: 8b1e4c6f2a90
+Create Date: 2026-10-18 13:05:27.640912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47d90e1b3a5'
+down_revision = '8b1e4c6f2a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('holdings', schema=None) as batch_op:
+        batch_op.create_index('idx_holding_portfolio_purchase', ['portfolio_id', 'purchase_date', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('holdings', schema=None) as batch_op:
+        batch_op.drop_index('idx_holding_portfolio_purchase')
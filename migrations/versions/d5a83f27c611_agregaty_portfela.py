@@ -0,0 +1,80 @@
+"""Zmaterializowane agregaty portfela (statystyki)
+
+Agregaty istniejących portfeli są wypełniane w migracji (INSERT ... SELECT ... GROUP BY
+po holdings); `flask aggregates rebuild` pozostaje do naprawy pojedynczych portfeli.
+
+Revision ID: d5a83f27c611
+Revises: c47d90e1b3a5
+Create Date: 2026-10-18 13:48:19.207734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a83f27c611'
+down_revision = 'c47d90e1b3a5'
+branch_labels = None
+depends_on = None
+
+# Reguła rynku jak w AggregateService (emitent / seria obligacji skarbowej); grupa bez typu - 'Inne'
+TREASURY_ISSUER_KEYWORDS = ('skarb', 'minister')
+TREASURY_SERIES_PREFIXES = ('OTS', 'DOS', 'TOZ', 'COI', 'EDO', 'ROR', 'DOR', 'SP', 'DS', 'WS', 'PS')
+MISSING_GROUP = 'Inne'
+
+
+def upgrade():
+    op.create_table('portfolio_aggregates',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('portfolio_id', sa.BigInteger(), nullable=False),
+    sa.Column('dimension', sa.String(length=20), nullable=False),
+    sa.Column('group_key', sa.String(length=100), nullable=False),
+    sa.Column('total_value', sa.DECIMAL(precision=18, scale=4), nullable=False),
+    sa.Column('invested_cost', sa.DECIMAL(precision=18, scale=4), nullable=False),
+    sa.Column('holdings_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('portfolio_id', 'dimension', 'group_key', name='uq_portfolio_aggregate_group')
+    )
+    _backfill()
+
+
+def _backfill():
+    """Agregaty istniejących pozycji - jedno INSERT ... SELECT ... GROUP BY na wymiar."""
+    holdings = sa.table('holdings', sa.column('id'), sa.column('portfolio_id'), sa.column('bond_definition_id'),
+                        sa.column('current_value'), sa.column('quantity'), sa.column('purchase_price'))
+    bonds = sa.table('bond_definitions', sa.column('id'), sa.column('issuer'), sa.column('series'),
+                     sa.column('bond_type'))
+    aggregates = sa.table('portfolio_aggregates', sa.column('portfolio_id'), sa.column('dimension'),
+                          sa.column('group_key'), sa.column('total_value'), sa.column('invested_cost'),
+                          sa.column('holdings_count'), sa.column('updated_at'))
+
+    issuer = sa.func.lower(sa.func.coalesce(bonds.c.issuer, ''))
+    series = sa.func.upper(sa.func.coalesce(bonds.c.series, ''))
+    treasury = sa.or_(*[issuer.like(f'%{keyword}%') for keyword in TREASURY_ISSUER_KEYWORDS],
+                      *[series.like(f'{prefix}%') for prefix in TREASURY_SERIES_PREFIXES])
+    groups = {
+        'total': sa.literal(''),
+        'bond_type': sa.func.coalesce(sa.func.nullif(bonds.c.bond_type, ''), MISSING_GROUP),
+        'market': sa.case((treasury, 'Skarbowe'), else_='Korporacyjne'),
+    }
+    for dimension, key in groups.items():
+        select = sa.select(
+            holdings.c.portfolio_id,
+            sa.literal(dimension),
+            key,
+            sa.func.sum(sa.func.coalesce(holdings.c.current_value, 0)),
+            sa.func.sum(holdings.c.quantity * holdings.c.purchase_price),
+            sa.func.count(holdings.c.id),
+            sa.func.current_timestamp(),
+        ).select_from(holdings.join(bonds, bonds.c.id == holdings.c.bond_definition_id)) \
+            .group_by(holdings.c.portfolio_id, key)
+        op.execute(aggregates.insert().from_select(
+            ['portfolio_id', 'dimension', 'group_key', 'total_value', 'invested_cost', 'holdings_count',
+             'updated_at'], select))
+
+
+def downgrade():
+    op.drop_table('portfolio_aggregates')
@@ -0,0 +1,27 @@
+"""Koszt zakupu w historii wyceny portfela
+
+Revision ID: f1c83a5e0d27
+Revises: d5a83f27c611
+Create Date: 2026-10-18 16:05:41.502318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c83a5e0d27'
+down_revision = 'd5a83f27c611'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('portfolio_history', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('invested_value', sa.DECIMAL(precision=15, scale=2), server_default='0',
+                                      nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('portfolio_history', schema=None) as batch_op:
+        batch_op.drop_column('invested_value')